@@ -15,3 +15,17 @@ class Config:
     SQLALCHEMY_ECHO = False
     if echo_string.lower().strip() == "true":
         SQLALCHEMY_ECHO = True
+
+    # connection pool used by the database repository, any class in sqlalchemy.pool;
+    # the size and overflow settings only apply to QueuePool
+    SQLALCHEMY_POOL_CLASS = environ.get("SQLALCHEMY_POOL_CLASS", "QueuePool")
+    SQLALCHEMY_POOL_SIZE = int(environ.get("SQLALCHEMY_POOL_SIZE", 5))
+    SQLALCHEMY_MAX_OVERFLOW = int(environ.get("SQLALCHEMY_MAX_OVERFLOW", 10))
+
+    # pragmas run on every new SQLite connection
+    SQLITE_JOURNAL_MODE = environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    # negative values are in KiB rather than pages
+    SQLITE_CACHE_SIZE = int(environ.get("SQLITE_CACHE_SIZE", -64 * 1024))
+    SQLITE_BUSY_TIMEOUT = int(environ.get("SQLITE_BUSY_TIMEOUT", 5000))
@@ -9,12 +9,11 @@ from .user import user
 from .adapters import database_repository
 from .adapters.memory_repository import MemoryRepository
 from .adapters.repository_populate import populate
-from .adapters.orm import metadata, map_model_to_tables
+from .adapters.orm import metadata, map_model_to_tables, schema_is_current
 
 # imports from SQLAlchemy
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, pool
 from sqlalchemy.orm import sessionmaker, clear_mappers
-from sqlalchemy.pool import NullPool
 
 import games.adapters.repository as repo
 
@@ -35,12 +34,21 @@ def create_app(test_config=None):
 
         database_echo = app.config["SQLALCHEMY_ECHO"]
 
+        poolclass = getattr(pool, app.config["SQLALCHEMY_POOL_CLASS"])
+        pool_options = {}
+        if issubclass(poolclass, pool.QueuePool):
+            pool_options["pool_size"] = app.config["SQLALCHEMY_POOL_SIZE"]
+            pool_options["max_overflow"] = app.config["SQLALCHEMY_MAX_OVERFLOW"]
+
         database_engine = create_engine(
             database_uri,
             connect_args={"check_same_thread": False},
-            poolclass=NullPool,
+            poolclass=poolclass,
             echo=database_echo,
+            **pool_options,
         )
+        if database_engine.dialect.name == "sqlite":
+            set_sqlite_pragmas(database_engine, app.config)
 
         session_factory = sessionmaker(
             autocommit=False, autoflush=True, bind=database_engine
@@ -50,12 +58,21 @@ def create_app(test_config=None):
             session_factory
         )
 
+        table_names = inspect(database_engine).get_table_names()
+        outdated_schema = len(table_names) > 0 and not schema_is_current(
+            database_engine
+        )
         if (
             app.config["TESTING"] == "True"
-            or len(database_engine.table_names()) == 0
+            or len(table_names) == 0
+            or outdated_schema
         ):
             print("REPOPULATING DATABASE...")
             clear_mappers()
+            if outdated_schema:
+                # built by an older version of the app, rebuilt from the data files
+                print("DATABASE SCHEMA IS OUT OF DATE, REBUILDING...")
+                metadata.drop_all(database_engine)
             metadata.create_all(
                 database_engine
             )  # Conditionally create database tables.
@@ -74,6 +91,14 @@ def create_app(test_config=None):
         else:
             map_model_to_tables()
 
+        @app.teardown_appcontext
+        def remove_database_session(exception=None):
+            # each request gets a fresh session, so the identity map can't grow
+            # across requests or hand stale objects to the next one
+            if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
+                size = repo.repo_instance.remove_session()
+                app.logger.debug(f"Identity map held {size} objects at the end of the request")
+
     with app.app_context():
         app.register_blueprint(home.home_blueprint)
         app.register_blueprint(games.games_blueprint, url_prefix="/games")
@@ -85,3 +110,20 @@ def create_app(test_config=None):
         app.register_blueprint(user.user_blueprint, url_prefix="/user")
 
     return app
+
+
+def set_sqlite_pragmas(engine, config):
+    pragmas = {
+        "journal_mode": config["SQLITE_JOURNAL_MODE"],
+        "synchronous": config["SQLITE_SYNCHRONOUS"],
+        "mmap_size": config["SQLITE_MMAP_SIZE"],
+        "cache_size": config["SQLITE_CACHE_SIZE"],
+        "busy_timeout": config["SQLITE_BUSY_TIMEOUT"],
+    }
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
@@ -1,15 +1,59 @@
-import math
-
-from sqlalchemy.orm import scoped_session
+from sqlalchemy import case, func, inspect, or_, select, text
+from sqlalchemy.orm import scoped_session, joinedload, selectinload
+from sqlalchemy.sql.expression import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
 from sqlalchemy.orm.exc import NoResultFound
 
 from typing import List
-from datetime import datetime
 
 from games.adapters.repository import AbstractRepository
+from games.adapters.orm import (
+    GAMES_SEARCH_INSERT_TRIGGER,
+    GAMES_SEARCH_REBUILD,
+    catalogue_version_table,
+    games_search_table,
+    games_table,
+    genres_table,
+    publishers_table,
+    games_genre_table,
+    reviews_table,
+)
 from games.domainmodel.model import Game, User, Genre, Review, Publisher
 
 
+# ORDER BY clauses for each sort mode, ties broken by title
+SORT_ORDERS = {
+    "name": (games_table.c.game_title,),
+    "date": (games_table.c.release_date_ordinal, games_table.c.game_title),
+    "latest": (
+        games_table.c.release_date_ordinal.desc(),
+        games_table.c.game_title,
+    ),
+    "price": (games_table.c.game_price, games_table.c.game_title),
+}
+
+# title order written as +game_title, which SQLite can't read from
+# ix_games_game_title. With a price or release date range the planner then
+# reads just the range from ix_games_price_title or ix_games_release_date_title
+# and sorts it, rather than walking every title looking for games in range
+_RANGE_TITLE_ORDER = UnaryExpression(games_table.c.game_title, operator=custom_op("+"))
+
+# search results can also be sorted best rated first, unreviewed games last
+_average_rating = (
+    select(func.avg(reviews_table.c.rating))
+    .where(reviews_table.c.game_id == games_table.c.game_id)
+    .scalar_subquery()
+)
+SEARCH_SORT_ORDERS = dict(
+    SORT_ORDERS,
+    rating=(
+        _average_rating.is_(None),
+        _average_rating.desc(),
+        games_table.c.game_title,
+    ),
+)
+
+
 class SessionContextManager:
     def __init__(self, session_factory):
         self.__session_factory = session_factory
@@ -41,10 +85,27 @@ class SessionContextManager:
         if not self.__session is None:
             self.__session.close()
 
+    def remove_current_session(self):
+        # closes the session and drops it from the registry, so the next use
+        # starts a new session with an empty identity map
+        self.__session.remove()
+
+    @property
+    def identity_map_size(self):
+        if not self.__session.registry.has():
+            return 0
+        return len(self.__session.identity_map)
+
 
 class SqlAlchemyRepository(AbstractRepository):
     def __init__(self, session_factory):
         self._session_cm = SessionContextManager(session_factory)
+        # identity map sizes seen when sessions are removed at the end of requests
+        self.__session_metrics = {
+            "sessions_removed": 0,
+            "last_identity_map_size": 0,
+            "max_identity_map_size": 0,
+        }
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -52,6 +113,20 @@ class SqlAlchemyRepository(AbstractRepository):
     def reset_session(self):
         self._session_cm.reset_session()
 
+    def remove_session(self):
+        size = self._session_cm.identity_map_size
+        self._session_cm.remove_current_session()
+        self.__session_metrics["sessions_removed"] += 1
+        self.__session_metrics["last_identity_map_size"] = size
+        self.__session_metrics["max_identity_map_size"] = max(
+            size, self.__session_metrics["max_identity_map_size"]
+        )
+        return size
+
+    @property
+    def session_metrics(self):
+        return dict(self.__session_metrics)
+
     # self.__games = []
     # self.__publishers = set()
     # self.__genres = set()
@@ -69,8 +144,105 @@ class SqlAlchemyRepository(AbstractRepository):
                 scm.session.merge(game)
                 scm.commit()
 
+    def add_games(self, games: List[Game], batch_size=1000):
+        # bulk path for loading a catalogue: genres and publishers are deduped
+        # here rather than queried per game, and each batch is written with
+        # multi-row inserts in a single transaction. On SQLite the full-text
+        # index is built once at the end rather than by a trigger per row
+        games = [game for game in games if isinstance(game, Game)]
+        if not games:
+            return
+        with self._session_cm as scm:
+            connection = scm.session.connection()
+            rebuild_search = connection.dialect.name == "sqlite"
+            if rebuild_search:
+                connection.execute(text("DROP TRIGGER IF EXISTS games_search_insert"))
+            try:
+                self.__insert_games(scm, games, batch_size)
+            finally:
+                if rebuild_search:
+                    # also rebuilt after a failed batch, so the index matches
+                    # whatever was committed
+                    scm.rollback()
+                    connection = scm.session.connection()
+                    connection.execute(text(GAMES_SEARCH_INSERT_TRIGGER))
+                    connection.execute(text(GAMES_SEARCH_REBUILD))
+                    scm.commit()
+
+    def __insert_games(self, scm, games, batch_size):
+        connection = scm.session.connection()
+        genre_names = set(
+            connection.execute(select(genres_table.c.genre_name)).scalars()
+        )
+        publisher_names = set(
+            connection.execute(
+                select(publishers_table.c.publisher_name)
+            ).scalars()
+        )
+        game_ids = set(
+            connection.execute(select(games_table.c.game_id)).scalars()
+        )
+
+        for start in range(0, len(games), batch_size):
+            genre_rows = []
+            publisher_rows = []
+            game_rows = []
+            game_genre_rows = []
+            for game in games[start : start + batch_size]:
+                if game.game_id in game_ids:
+                    continue
+                game_ids.add(game.game_id)
+
+                publisher_name = None
+                if game.publisher is not None:
+                    publisher_name = game.publisher.publisher_name
+                    if publisher_name not in publisher_names:
+                        publisher_names.add(publisher_name)
+                        publisher_rows.append(
+                            {"publisher_name": publisher_name}
+                        )
+
+                game_rows.append(
+                    {
+                        "game_id": game.game_id,
+                        "game_title": game.title,
+                        "game_price": game.price,
+                        "release_date": game.release_date,
+                        "release_date_ordinal": game.release_date_ordinal,
+                        "game_description": game.description,
+                        "game_image_url": game.image_url,
+                        "game_website_url": game.website_url,
+                        "publisher_name": publisher_name,
+                    }
+                )
+
+                for genre in game.genres:
+                    if genre.genre_name not in genre_names:
+                        genre_names.add(genre.genre_name)
+                        genre_rows.append({"genre_name": genre.genre_name})
+                    game_genre_rows.append(
+                        {"game_id": game.game_id, "genre_name": genre.genre_name}
+                    )
+
+            for table, rows in (
+                (publishers_table, publisher_rows),
+                (genres_table, genre_rows),
+                (games_table, game_rows),
+                (games_genre_table, game_genre_rows),
+            ):
+                if rows:
+                    connection.execute(table.insert(), rows)
+            scm.commit()
+            connection = scm.session.connection()
+
     def add_review(self, new_review: Review):
         if isinstance(new_review, Review):
+            # the review collections on User and Game are view only in the mapping.
+            # Unloaded ones are left alone, they will load the review with the rest
+            if "_User__reviews" in inspect(new_review.user).dict:
+                new_review.user.add_review(new_review)
+            if "_Game__reviews" in inspect(new_review.game).dict:
+                new_review.game.add_review(new_review)
             with self._session_cm as scm:
                 scm.session.merge(new_review)
                 scm.commit()
@@ -105,13 +277,52 @@ class SqlAlchemyRepository(AbstractRepository):
             scm.session.merge(user)
             scm.commit()
 
+    def _games_query(self):
+        # listings and search read each game's publisher and genres, so load
+        # them alongside the games rather than with one query per game
+        return self._session_cm.session.query(Game).options(
+            joinedload(Game._Game__publisher),
+            selectinload(Game._Game__genres),
+        )
+
     def get_games(self) -> List[Game]:
         return (
-            self._session_cm.session.query(Game)
+            self._games_query()
             .order_by(Game._Game__game_title)
             .all()
         )
 
+    def get_games_by_ids(self, game_ids) -> List[Game]:
+        games_by_id = {
+            game.game_id: game
+            for game in self._games_query()
+            .filter(games_table.c.game_id.in_(game_ids))
+            .all()
+        }
+        return [games_by_id[game_id] for game_id in game_ids if game_id in games_by_id]
+
+    def get_review_counts(self):
+        rows = self._session_cm.session.execute(
+            select(reviews_table.c.game_id, func.count()).group_by(
+                reviews_table.c.game_id
+            )
+        )
+        return dict(rows.all())
+
+    def get_catalogue_version(self):
+        # read from the database rather than counted here, so writes made by
+        # other workers or processes are seen too
+        version = self._session_cm.session.execute(
+            select(
+                catalogue_version_table.c.games_version,
+                catalogue_version_table.c.reviews_version,
+            )
+        ).one_or_none()
+        if version is None:
+            # nothing has been written since the tables were created
+            return 0, 0
+        return tuple(version)
+
     def get_number_of_games(self):
         return self._session_cm.session.query(Game).count()
 
@@ -143,30 +354,143 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return result
 
-    def get_sublist(self, super_list, l):
-        return [
-            super_list[i * l : (i + 1) * l]
-            for i in range(math.ceil(len(super_list) / l))
-        ]
+    def get_page(self, sort_mode="name", offset=0, limit=10, genre=None):
+        query = self._games_query()
+        if genre is not None:
+            query = query.filter(Game._Game__genres.contains(Genre(genre)))
+        total = query.count()
+        order = SORT_ORDERS.get(sort_mode, SORT_ORDERS["name"])
+        return query.order_by(*order).offset(offset).limit(limit).all(), total
+
+    def get_top_games(self, sort_mode="name", k=5) -> List[Game]:
+        order = SORT_ORDERS.get(sort_mode, SORT_ORDERS["name"])
+        return (
+            self._games_query()
+            .order_by(*order)
+            .limit(k)
+            .all()
+        )
+
+    def search_games(
+        self, query="", genre=None, publisher=None, offset=0, limit=None, **filters
+    ):
+        games = self._search_query(
+            self._games_query(), query, genre, publisher, **filters
+        )
+        total = games.count()
+        games = games.offset(offset)
+        if limit is not None:
+            games = games.limit(limit)
+        return games.all(), total
+
+    def search_game_ids(self, query="", genre=None, publisher=None, **filters):
+        games = self._search_query(
+            self._session_cm.session.query(Game), query, genre, publisher, **filters
+        )
+        return [game_id for game_id, in games.with_entities(games_table.c.game_id)]
+
+    def _search_query(
+        self,
+        games,
+        query="",
+        genre=None,
+        publisher=None,
+        with_genres=(),
+        any_genres=(),
+        without_genres=(),
+        min_price=None,
+        max_price=None,
+        released_from=None,
+        released_to=None,
+        sort_mode=None,
+        game_ids=None,
+    ):
+        # games, a query of Game, filtered and ordered for a search
+        if game_ids is not None:
+            games = games.filter(games_table.c.game_id.in_(game_ids))
+        if min_price is not None:
+            games = games.filter(games_table.c.game_price >= min_price)
+        if max_price is not None:
+            games = games.filter(games_table.c.game_price <= max_price)
+        if released_from is not None:
+            games = games.filter(
+                games_table.c.release_date_ordinal >= released_from.toordinal()
+            )
+        if released_to is not None:
+            games = games.filter(
+                games_table.c.release_date_ordinal <= released_to.toordinal()
+            )
+        if genre is not None:
+            games = games.filter(Game._Game__genres.contains(Genre(genre)))
+        for genre_name in with_genres:
+            games = games.filter(Game._Game__genres.contains(Genre(genre_name)))
+        if any_genres:
+            games = games.filter(
+                Game._Game__genres.any(Genre._Genre__genre_name.in_(any_genres))
+            )
+        if without_genres:
+            games = games.filter(
+                ~Game._Game__genres.any(
+                    Genre._Genre__genre_name.in_(without_genres)
+                )
+            )
+        if publisher is not None:
+            games = games.filter(games_table.c.publisher_name == publisher)
+
+        query = query.strip()
+        sqlite = self._session_cm.session.get_bind().dialect.name == "sqlite"
+        use_full_text = len(query) >= 3 and sqlite
+        title_order = games_table.c.game_title
+        if sqlite and any(
+            bound is not None
+            for bound in (min_price, max_price, released_from, released_to)
+        ):
+            title_order = _RANGE_TITLE_ORDER
+        if use_full_text:
+            # quoted as one phrase, which the trigram index matches as a substring
+            phrase = '"' + query.replace('"', '""') + '"'
+            matches = (
+                select(games_search_table.c.rowid, games_search_table.c.rank)
+                .where(games_search_table.c.games_search.op("MATCH")(phrase))
+                .subquery()
+            )
+            games = games.join(
+                matches, matches.c.rowid == games_table.c.game_id
+            ).order_by(matches.c.rank, games_table.c.game_title)
+        elif query:
+            # too short for trigrams, so scan with LIKE, title matches first
+            escaped = (
+                query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            pattern = f"%{escaped}%"
+            title_match = games_table.c.game_title.ilike(pattern, escape="\\")
+            games = games.filter(
+                or_(
+                    title_match,
+                    games_table.c.publisher_name.ilike(pattern, escape="\\"),
+                    games_table.c.game_description.ilike(pattern, escape="\\"),
+                )
+            ).order_by(case((title_match, 0), else_=1), games_table.c.game_title)
+        else:
+            games = games.order_by(title_order)
+        if sort_mode == "name":
+            games = games.order_by(None).order_by(title_order)
+        elif sort_mode in SEARCH_SORT_ORDERS:
+            games = games.order_by(None).order_by(*SEARCH_SORT_ORDERS[sort_mode])
+
+        return games
 
     def get_sorted_dataset(self, sort_mode="name", l=None) -> list:
         if l is None:
-            l = self.get_games()
+            order = SORT_ORDERS.get(sort_mode, SORT_ORDERS["name"])
+            return self._games_query().order_by(*order).all()
         # returns list of game objects sorted based on parameter sort_mode
         if sort_mode == "name":
             return sorted(l, key=lambda x: x.title)
         elif sort_mode == "date":
-            return sorted(
-                l,
-                key=lambda x: datetime.strptime(x.release_date, "%b %d, %Y"),
-                reverse=False,
-            )
+            return sorted(l, key=lambda x: x.release_date_ordinal, reverse=False)
         elif sort_mode == "latest":
-            return sorted(
-                l,
-                key=lambda x: datetime.strptime(x.release_date, "%b %d, %Y"),
-                reverse=True,
-            )
+            return sorted(l, key=lambda x: x.release_date_ordinal, reverse=True)
         elif sort_mode == "price":
             return sorted(l, key=lambda x: x.price)
 
@@ -190,13 +514,19 @@ class SqlAlchemyRepository(AbstractRepository):
         else:
             return game.reviews
 
-    def get_game(self, game_id) -> Game:
-        try:
-            game = (
-                self._session_cm.session.query(Game)
-                .filter(Game._Game__game_id == game_id)
-                .one()
+    def get_game(self, game_id, with_reviews=False) -> Game:
+        games = self._games_query()
+        if with_reviews:
+            # the game page lists every review with its author, so they arrive
+            # in one more query rather than one per review
+            games = games.options(
+                selectinload(Game._Game__reviews).options(
+                    joinedload(Review._Review__user),
+                    joinedload(Review._Review__game),
+                )
             )
+        try:
+            game = games.filter(Game._Game__game_id == game_id).one()
             return game
         except NoResultFound:
             return None
@@ -1,7 +1,6 @@
 import csv
 import os
 import math
-from datetime import datetime
 
 from games.domainmodel.model import Genre, Game, Publisher, Review, User
 
@@ -11,8 +10,9 @@ class GameFileCSVReader:
         self.__filename = filename
         self.__dataset_of_games = []
         self._games_by_genre = {}
-        self.__dataset_of_publishers = set()
-        self.__dataset_of_genres = set()
+        # name -> the one Publisher/Genre instance shared by every game that has it
+        self.__dataset_of_publishers = {}
+        self.__dataset_of_genres = {}
 
     def read_csv_file(self):
         if not os.path.exists(self.__filename):
@@ -31,7 +31,7 @@ class GameFileCSVReader:
                     game.image_url = row["Header image"]
 
                     publisher = Publisher(row["Publishers"])
-                    self.__dataset_of_publishers.add(publisher)
+                    publisher = self.__dataset_of_publishers.setdefault(publisher.publisher_name, publisher)
                     game.publisher = publisher
 
                     genre_names = row["Genres"].split(",")
@@ -40,7 +40,7 @@ class GameFileCSVReader:
                             self._games_by_genre[genre_name] = []
 
                         genre = Genre(genre_name.strip())
-                        self.__dataset_of_genres.add(genre)
+                        genre = self.__dataset_of_genres.setdefault(genre.genre_name, genre)
                         game.add_genre(genre)
 
                     self.__dataset_of_games.append(game)
@@ -77,11 +77,11 @@ class GameFileCSVReader:
 
     @property
     def dataset_of_publishers(self) -> set:
-        return sorted(self.__dataset_of_publishers, key=lambda x: x.publisher_name)
+        return sorted(self.__dataset_of_publishers.values(), key=lambda x: x.publisher_name)
 
     @property
     def dataset_of_genres(self) -> set:
-        return sorted(self.__dataset_of_genres, key=lambda x: x.genre_name)
+        return sorted(self.__dataset_of_genres.values(), key=lambda x: x.genre_name)
 
     def get_sorted_dataset(self, sort_mode="name", l=None) -> list:
         if l is None:
@@ -90,9 +90,9 @@ class GameFileCSVReader:
         if sort_mode == "name":
             return sorted(l, key=lambda x: x.title)
         elif sort_mode == "date":
-            return sorted(l, key=lambda x: datetime.strptime(x.release_date, "%b %d, %Y"), reverse=False)
+            return sorted(l, key=lambda x: x.release_date_ordinal, reverse=False)
         elif sort_mode == "latest":
-            return sorted(l, key=lambda x: datetime.strptime(x.release_date, "%b %d, %Y"), reverse=True)
+            return sorted(l, key=lambda x: x.release_date_ordinal, reverse=True)
         elif sort_mode == "price":
             return sorted(l, key=lambda x: x.price)
 
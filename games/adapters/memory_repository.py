@@ -1,11 +1,9 @@
 import csv
 import os
-import math
 
-
-# from bisect import bisect, bisect_left, insort_left
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
 from typing import List
-from datetime import datetime
 
 from games.adapters.repository import AbstractRepository, RepositoryException
 from games.domainmodel.model import Game, User, Genre, Review, Wishlist
@@ -14,6 +12,89 @@ from games.adapters.datareader.csvdatareader import (
     ReviewCSVReader,
     UserCSVReader,
 )
+from games.utilities.trigram_index import TrigramIndex
+
+
+def _missing_last(value):
+    # games added without a price or release date sort after every other game
+    return value is None, value
+
+
+def _latest_key(game: Game):
+    date = game.release_date_ordinal
+    return _missing_last(None if date is None else -date)
+
+
+SORT_KEYS = {
+    "name": lambda game: _missing_last(game.title),
+    "date": lambda game: _missing_last(game.release_date_ordinal),
+    "latest": _latest_key,
+    "price": lambda game: _missing_last(game.price),
+}
+
+
+def _rating_key(game: Game):
+    # best rated first, unreviewed games last
+    rating = game.average_rating
+    return _missing_last(None if rating is None else -rating)
+
+
+# orders search results can be sorted into besides relevance
+SEARCH_SORT_KEYS = dict(SORT_KEYS, rating=_rating_key)
+
+
+class SortedGames(Sequence):
+    # read-only list of games kept in one sort order, with the sort keys stored
+    # alongside so new games are placed with bisect rather than re-sorting
+    def __init__(self, sort_key):
+        self.__sort_key = sort_key
+        self.__keys = []
+        self.__games = []
+
+    def insert(self, game: Game):
+        key = self.__sort_key(game)
+        index = bisect_right(self.__keys, key)
+        self.__keys.insert(index, key)
+        self.__games.insert(index, game)
+
+    def extend(self, games):
+        # adds many games with one sort rather than a list insert each. The sort
+        # is stable, so ties keep the order insert would have given them
+        entries = list(zip(self.__keys, self.__games))
+        entries.extend((self.__sort_key(game), game) for game in games)
+        entries.sort(key=lambda entry: entry[0])
+        self.__keys = [key for key, _ in entries]
+        self.__games = [game for _, game in entries]
+
+    def between(self, low=None, high=None):
+        # games whose sort value lies in [low, high], either end open if None;
+        # games missing the value are never included
+        start = 0 if low is None else bisect_left(self.__keys, _missing_last(low))
+        if high is None:
+            end = bisect_left(self.__keys, (True,))
+        else:
+            end = bisect_right(self.__keys, _missing_last(high))
+        return self.__games[start:end]
+
+    def __getitem__(self, index):
+        return self.__games[index]
+
+    def __len__(self):
+        return len(self.__games)
+
+    def __iter__(self):
+        return iter(self.__games)
+
+    def __eq__(self, other):
+        # compares equal to any sequence, such as a list, holding the same games
+        if isinstance(other, SortedGames):
+            return self.__games == other.__games
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return self.__games == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<SortedGames {self.__games}>"
 
 
 class MemoryRepository(AbstractRepository):
@@ -21,23 +102,98 @@ class MemoryRepository(AbstractRepository):
         self.__games = []
         self.__publishers = set()
         self.__genres = set()
+        # genre name -> every sort order of the games in that genre
         self.__games_by_genre = {}
+        # genre and publisher name -> ids of their games, for search filters
+        self.__game_ids_by_genre = {}
+        self.__game_ids_by_publisher = {}
+        # genre name -> bit number, and game id -> bitmask of the game's genres,
+        # for AND/OR/NOT genre filters in a single pass over the catalogue
+        self.__genre_bits = {}
+        self.__genre_masks = {}
         self.__users = []
+        # hash indexes so single game and user lookups don't scan the lists above
+        self.__games_by_id = {}
+        self.__users_by_name = {}
+        # every sort order the listing pages use, kept up to date by add_game(s)
+        self.__sorted_games = self.__new_sorted_views()
+        # substring search over titles and publisher names. Descriptions are
+        # too long to index, search_games checks them directly instead
+        self.__title_index = TrigramIndex()
+        self.__publisher_index = TrigramIndex()
+        self.__descriptions = {}
+        # search sort mode -> game id -> position of the game in that order,
+        # built on first use and dropped whenever games or reviews are added
+        self.__ranks = {}
+        # bumped as games and reviews are added, see get_catalogue_version
+        self.__games_version = 0
+        self.__reviews_version = 0
+
+    @staticmethod
+    def __new_sorted_views():
+        return {
+            sort_mode: SortedGames(sort_key)
+            for sort_mode, sort_key in SORT_KEYS.items()
+        }
 
     def add_game(self, game: Game):
-        if isinstance(game, Game):
-            self.__games.append(game)
+        if self.__register(game):
+            for sorted_games in self.__sorted_games.values():
+                sorted_games.insert(game)
+            for genre in game.genres:
+                for sorted_games in self.__games_by_genre[
+                    genre.genre_name
+                ].values():
+                    sorted_games.insert(game)
+
+    def add_games(self, games: List[Game]):
+        # registers every game first and then sorts each view once
+        added = [game for game in games if self.__register(game)]
+        added_by_genre = {}
+        for game in added:
             for genre in game.genres:
-                if genre not in self.__genres:
-                    self.__genres.add(genre)
-                    self.__games_by_genre[genre.genre_name] = []
-                self.__games_by_genre[genre.genre_name].append(game)
-            self.__publishers.add(game.publisher)
+                added_by_genre.setdefault(genre.genre_name, []).append(game)
+        for sorted_games in self.__sorted_games.values():
+            sorted_games.extend(added)
+        for genre_name, genre_games in added_by_genre.items():
+            for sorted_games in self.__games_by_genre[genre_name].values():
+                sorted_games.extend(genre_games)
+
+    def __register(self, game):
+        # adds game to everything but the sorted views, returning whether it is new
+        if not isinstance(game, Game) or game.game_id in self.__games_by_id:
+            return False
+        self.__games.append(game)
+        self.__games_by_id[game.game_id] = game
+        for genre in game.genres:
+            if genre not in self.__genres:
+                self.__genres.add(genre)
+                self.__games_by_genre[genre.genre_name] = self.__new_sorted_views()
+            self.__game_ids_by_genre.setdefault(genre.genre_name, set()).add(
+                game.game_id
+            )
+        self.__genre_masks[game.game_id] = self.__genre_mask(
+            [genre.genre_name for genre in game.genres], assign=True
+        )
+        self.__publishers.add(game.publisher)
+        self.__title_index.add(game.game_id, game.title)
+        if game.publisher is not None:
+            self.__publisher_index.add(game.game_id, game.publisher.publisher_name)
+            self.__game_ids_by_publisher.setdefault(
+                game.publisher.publisher_name, set()
+            ).add(game.game_id)
+        if game.description is not None:
+            self.__descriptions[game.game_id] = game.description.lower()
+        self.__ranks.clear()
+        self.__games_version += 1
+        return True
 
     def add_review(self, review: Review):
         if isinstance(review, Review):
             review.user.add_review(review)
             review.game.add_review(review)
+            self.__ranks.pop("rating", None)
+            self.__reviews_version += 1
 
     def add_to_wishlist(self, user: User, game: Game):
         user.wishlist.add_game(game)
@@ -55,7 +211,26 @@ class MemoryRepository(AbstractRepository):
         user.set_bio(bio)
 
     def get_games(self) -> List[Game]:
-        return sorted(self.__games, key=lambda x: x.title)
+        return self.__sorted_games["name"]
+
+    def search_game_ids(self, query="", genre=None, publisher=None, **filters):
+        return [
+            game.game_id
+            for game in self.__matching_games(query, genre, publisher, **filters)
+        ]
+
+    def get_games_by_ids(self, game_ids) -> List[Game]:
+        return [
+            self.__games_by_id[game_id]
+            for game_id in game_ids
+            if game_id in self.__games_by_id
+        ]
+
+    def get_review_counts(self):
+        return {game.game_id: len(game.reviews) for game in self.__games if game.reviews}
+
+    def get_catalogue_version(self):
+        return self.__games_version, self.__reviews_version
 
     def get_number_of_games(self):
         return len(self.__games)
@@ -67,36 +242,214 @@ class MemoryRepository(AbstractRepository):
         return sorted(self.__publishers, key=lambda x: x.publisher_name)
 
     def get_games_by_genre(self, genre):
-        return sorted(self.__games_by_genre[genre], key=lambda x: x.title)
+        if genre not in self.__games_by_genre:
+            return []
+        return self.__games_by_genre[genre]["name"]
+
+    def get_page(self, sort_mode="name", offset=0, limit=10, genre=None):
+        if sort_mode not in SORT_KEYS:
+            sort_mode = "name"
+        if genre is None:
+            games = self.__sorted_games[sort_mode]
+        elif genre in self.__games_by_genre:
+            games = self.__games_by_genre[genre][sort_mode]
+        else:
+            return [], 0
+        return games[offset : offset + limit], len(games)
+
+    def get_top_games(self, sort_mode="name", k=5) -> List[Game]:
+        if sort_mode not in SORT_KEYS:
+            sort_mode = "name"
+        return self.__sorted_games[sort_mode][:k]
+
+    def __genre_mask(self, genre_names, assign=False):
+        # None if a genre has never been seen and assign is False
+        mask = 0
+        for genre_name in genre_names:
+            if genre_name not in self.__genre_bits:
+                if not assign:
+                    return None
+                self.__genre_bits[genre_name] = len(self.__genre_bits)
+            mask |= 1 << self.__genre_bits[genre_name]
+        return mask
+
+    def __game_ids_by_genre_masks(
+        self, with_genres, any_genres, without_genres, game_ids=None
+    ):
+        # checks only game_ids if given, rather than the whole catalogue
+        required = self.__genre_mask(with_genres)
+        if required is None:
+            return set()
+        wanted = self.__genre_mask(
+            [name for name in any_genres if name in self.__genre_bits]
+        )
+        if any_genres and not wanted:
+            return set()
+        excluded = self.__genre_mask(
+            [name for name in without_genres if name in self.__genre_bits]
+        )
+        if game_ids is None:
+            masks = self.__genre_masks.items()
+        else:
+            masks = ((game_id, self.__genre_masks[game_id]) for game_id in game_ids)
+        return {
+            game_id
+            for game_id, mask in masks
+            if mask & required == required
+            and (not wanted or mask & wanted)
+            and not mask & excluded
+        }
+
+    def search_games(
+        self, query="", genre=None, publisher=None, offset=0, limit=None, **filters
+    ):
+        matches = self.__matching_games(query, genre, publisher, **filters)
+        end = None if limit is None else offset + limit
+        return matches[offset:end], len(matches)
+
+    def __matching_games(
+        self,
+        query="",
+        genre=None,
+        publisher=None,
+        with_genres=(),
+        any_genres=(),
+        without_genres=(),
+        min_price=None,
+        max_price=None,
+        released_from=None,
+        released_to=None,
+        sort_mode=None,
+        game_ids=None,
+    ):
+        # every game a search matches, in order, for search_games and
+        # search_game_ids to page or map to ids
+        query = query.strip()
+        if sort_mode not in SEARCH_SORT_KEYS:
+            sort_mode = None
 
-    def get_sublist(self, super_list, l=10):
+        # intersect the genre and publisher posting lists, smallest first
+        filters = []
+        if game_ids is not None:
+            game_ids = {game_id for game_id in game_ids if game_id in self.__games_by_id}
+            filters.append(game_ids)
+        if genre is not None:
+            filters.append(self.__game_ids_by_genre.get(genre, set()))
+        if publisher is not None:
+            filters.append(self.__game_ids_by_publisher.get(publisher, set()))
+        if with_genres or any_genres or without_genres:
+            filters.append(
+                self.__game_ids_by_genre_masks(
+                    with_genres, any_genres, without_genres, game_ids
+                )
+            )
+        # price and release date ranges are slices of the sorted views
+        if min_price is not None or max_price is not None:
+            filters.append(
+                {
+                    game.game_id
+                    for game in self.__sorted_games["price"].between(
+                        min_price, max_price
+                    )
+                }
+            )
+        if released_from is not None or released_to is not None:
+            filters.append(
+                {
+                    game.game_id
+                    for game in self.__sorted_games["date"].between(
+                        released_from and released_from.toordinal(),
+                        released_to and released_to.toordinal(),
+                    )
+                }
+            )
+        filters.sort(key=len)
+        candidates = None
+        for game_ids in filters:
+            candidates = set(game_ids) if candidates is None else candidates & game_ids
+            if not candidates:
+                return []
+
+        if not query:
+            listing_mode = sort_mode or "name"
+            if listing_mode in SORT_KEYS and candidates is None:
+                matches = self.__sorted_games[listing_mode]
+            elif (
+                listing_mode in SORT_KEYS
+                and genre is not None
+                and len(filters) == 1
+            ):
+                matches = self.__games_by_genre[genre][listing_mode]
+            else:
+                if candidates is None:
+                    candidates = self.__games_by_id
+                matches = self.__games_sorted_by(listing_mode, candidates)
+            return matches
+
+        # title matches rank above publisher matches, then description matches
+        tiers = []
+        seen = set()
+        for index in (self.__title_index, self.__publisher_index):
+            if candidates is not None and len(candidates) <= index.estimate(query):
+                # fewer filtered games than the text index would check
+                game_ids = {
+                    game_id for game_id in candidates if index.contains(game_id, query)
+                }
+            else:
+                game_ids = index.search(query)
+                if candidates is not None:
+                    game_ids &= candidates
+            game_ids -= seen
+            seen |= game_ids
+            tiers.append(game_ids)
+        lowered = query.lower()
+        game_ids = {
+            game_id
+            for game_id in (self.__descriptions if candidates is None else candidates)
+            if game_id not in seen and lowered in self.__descriptions.get(game_id, "")
+        }
+        seen |= game_ids
+        tiers.append(game_ids)
+
+        if sort_mode is None:
+            matches = [
+                game for tier in tiers for game in self.__games_sorted_by("name", tier)
+            ]
+        else:
+            matches = self.__games_sorted_by(sort_mode, seen)
+        return matches
+
+    def __games_sorted_by(self, sort_mode, game_ids):
+        # sorts on precomputed integer ranks rather than comparing titles,
+        # prices and dates again for every search
+        ranks = self.__rank_of(sort_mode)
         return [
-            super_list[i * l : (i + 1) * l]
-            for i in range(math.ceil(len(super_list) / l))
+            self.__games_by_id[game_id]
+            for game_id in sorted(game_ids, key=ranks.__getitem__)
         ]
 
+    def __rank_of(self, sort_mode):
+        if sort_mode not in self.__ranks:
+            if sort_mode in SORT_KEYS:
+                ordered = self.__sorted_games[sort_mode]
+            else:
+                # ties in the other orders fall back to name order
+                ordered = sorted(
+                    self.__sorted_games["name"], key=SEARCH_SORT_KEYS[sort_mode]
+                )
+            self.__ranks[sort_mode] = {
+                game.game_id: rank for rank, game in enumerate(ordered)
+            }
+        return self.__ranks[sort_mode]
+
     def get_sorted_dataset(self, sort_mode="name", l=None) -> list:
+        if sort_mode not in SORT_KEYS:
+            sort_mode = "name"
+        # the whole catalogue is already held in every sort order
         if l is None:
-            l = self.__games
+            return self.__sorted_games[sort_mode]
         # returns list of game objects sorted based on parameter sort_mode
-        if sort_mode == "name":
-            return sorted(l, key=lambda x: x.title)
-        elif sort_mode == "date":
-            return sorted(
-                l,
-                key=lambda x: datetime.strptime(x.release_date, "%b %d, %Y"),
-                reverse=False,
-            )
-        elif sort_mode == "latest":
-            return sorted(
-                l,
-                key=lambda x: datetime.strptime(x.release_date, "%b %d, %Y"),
-                reverse=True,
-            )
-        elif sort_mode == "price":
-            return sorted(l, key=lambda x: x.price)
-
-        return sorted(l, key=lambda x: x.title)
+        return sorted(l, key=SORT_KEYS[sort_mode])
 
     def get_sorted_reviews_for_game(self, game: Game, sort_option: str):
         if sort_option == "comment_length-ascend":
@@ -116,19 +469,23 @@ class MemoryRepository(AbstractRepository):
         else:
             return game.reviews
 
-    def get_game(self, game_id) -> Game:
-        index = self.__games.index(Game(int(game_id), ""))
-        game = self.__games[index]
-        return game
+    def get_game(self, game_id, with_reviews=False) -> Game:
+        # reviews are always held in memory, with_reviews is for the database
+        game_id = int(game_id)
+        if game_id not in self.__games_by_id:
+            # same error the old list.index() lookup raised for unknown ids
+            raise ValueError(f"{game_id} is not in list")
+        return self.__games_by_id[game_id]
 
     def add_user(self, user: User):
         self.__users.append(user)
+        if isinstance(user, User):
+            self.__users_by_name.setdefault(user.username, user)
 
     def get_users(self) -> list:
         return self.__users
 
     def get_user(self, username: str) -> User:
-        u = User(username, "abcdefghliasd")
-        if u in self.__users:
-            return self.__users[self.__users.index(u)]
-        return None
+        if not isinstance(username, str):
+            return None
+        return self.__users_by_name.get(username.strip())
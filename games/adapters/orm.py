@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    DDL,
     Table,
     MetaData,
     Column,
@@ -7,6 +8,10 @@ from sqlalchemy import (
     ForeignKey,
     Text,
     Float,
+    Index,
+    UniqueConstraint,
+    event,
+    inspect,
 )
 from sqlalchemy.orm import mapper, relationship
 
@@ -17,6 +22,8 @@ from games.domainmodel.model import (
     Review,
     Wishlist,
     Genre,
+    ReviewCollection,
+    GameCollection,
 )
 
 # global variable giving access to the MetaData (schema) information of the database
@@ -46,13 +53,62 @@ games_table = Table(
     "games",
     metadata,
     Column("game_id", Integer, primary_key=True),
-    Column("game_title", Text, nullable=False),
+    Column("game_title", Text, nullable=False, index=True),
     Column("game_price", Float, nullable=False),
     Column("release_date", String(50), nullable=False),
+    # release date as a day number so date orders can be sorted in SQL
+    Column("release_date_ordinal", Integer, nullable=True),
     Column("game_description", String(255), nullable=True),
     Column("game_image_url", String(255), nullable=True),
     Column("game_website_url", String(255), nullable=True),
     Column("publisher_name", ForeignKey("publishers.publisher_name")),
+    # the price and date listing orders, with title as the tie breaker
+    Index("ix_games_price_title", "game_price", "game_title"),
+    Index("ix_games_release_date_title", "release_date_ordinal", "game_title"),
+)
+
+# full-text index over the searchable game columns, kept in sync by triggers on
+# games so every write path updates it. The trigram tokenizer keeps the old
+# case-insensitive substring matching, and rank weights title above publisher
+# above description. SQLite only, so it lives outside the MetaData.
+games_search_table = Table(
+    "games_search",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("games_search", Text),
+    Column("rank", Float),
+)
+
+# dropped while add_games loads a catalogue, which rebuilds the index once after
+GAMES_SEARCH_INSERT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS games_search_insert AFTER INSERT ON games BEGIN "
+    "INSERT INTO games_search(rowid, game_title, game_description, publisher_name) "
+    "VALUES (new.game_id, new.game_title, new.game_description, new.publisher_name); END"
+)
+GAMES_SEARCH_REBUILD = "INSERT INTO games_search(games_search) VALUES ('rebuild')"
+
+GAMES_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS games_search USING fts5("
+    "game_title, game_description, publisher_name, "
+    "content='games', content_rowid='game_id', tokenize='trigram')",
+    "INSERT INTO games_search(games_search, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+    GAMES_SEARCH_INSERT_TRIGGER,
+    "CREATE TRIGGER IF NOT EXISTS games_search_delete AFTER DELETE ON games BEGIN "
+    "INSERT INTO games_search(games_search, rowid, game_title, game_description, publisher_name) "
+    "VALUES ('delete', old.game_id, old.game_title, old.game_description, old.publisher_name); END",
+    "CREATE TRIGGER IF NOT EXISTS games_search_update AFTER UPDATE ON games BEGIN "
+    "INSERT INTO games_search(games_search, rowid, game_title, game_description, publisher_name) "
+    "VALUES ('delete', old.game_id, old.game_title, old.game_description, old.publisher_name); "
+    "INSERT INTO games_search(rowid, game_title, game_description, publisher_name) "
+    "VALUES (new.game_id, new.game_title, new.game_description, new.publisher_name); END",
+)
+
+for statement in GAMES_SEARCH_DDL:
+    event.listen(games_table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    games_table,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS games_search").execute_if(dialect="sqlite"),
 )
 
 
@@ -61,9 +117,12 @@ reviews_table = Table(
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("user_name", ForeignKey("users.user_name")),
-    Column("game_id", ForeignKey("games.game_id")),
+    Column("game_id", ForeignKey("games.game_id"), index=True),
     Column("rating", Integer, nullable=False),
     Column("comment", String, nullable=False),
+    # not unique: ReviewCollection lets a user review the same game more than
+    # once. Also serves lookups by user_name, as its leading column
+    Index("ix_reviews_user_name_game_id", "user_name", "game_id"),
 )
 
 games_genre_table = Table(
@@ -71,14 +130,16 @@ games_genre_table = Table(
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("game_id", ForeignKey("games.game_id")),
-    Column("genre_name", ForeignKey("genres.genre_name")),
+    Column("genre_name", ForeignKey("genres.genre_name"), index=True),
+    # also serves lookups by game_id, as its leading column
+    UniqueConstraint("game_id", "genre_name"),
 )
 
 wishlist_table = Table(
     "wishlist",
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
-    Column("user_id", ForeignKey("users.user_name")),
+    Column("user_id", ForeignKey("users.user_name"), unique=True),
 )
 
 wishlist_game_table = Table(
@@ -87,6 +148,7 @@ wishlist_game_table = Table(
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("wishlist_id", ForeignKey("wishlist.id")),
     Column("game_id", ForeignKey("games.game_id")),
+    UniqueConstraint("wishlist_id", "game_id"),
 )
 
 user_favouritesgames_table = Table(
@@ -95,8 +157,53 @@ user_favouritesgames_table = Table(
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("user_id", ForeignKey("users.user_name")),
     Column("game_id", ForeignKey("games.game_id")),
+    UniqueConstraint("user_id", "game_id"),
 )
 
+# counters bumped by triggers whenever a game or review is inserted, updated or
+# deleted, by this process or any other, see get_catalogue_version. The row is
+# created by the first change, so clearing the tables doesn't break the triggers
+catalogue_version_table = Table(
+    "catalogue_version",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("games_version", Integer, nullable=False, server_default="0"),
+    Column("reviews_version", Integer, nullable=False, server_default="0"),
+)
+
+for table, counter in ((games_table, "games_version"), (reviews_table, "reviews_version")):
+    for change in ("INSERT", "UPDATE", "DELETE"):
+        event.listen(
+            table,
+            "after_create",
+            DDL(
+                f"CREATE TRIGGER IF NOT EXISTS {table.name}_version_{change.lower()} "
+                f"AFTER {change} ON {table.name} BEGIN "
+                f"INSERT INTO catalogue_version (id, {counter}) VALUES (1, 1) "
+                f"ON CONFLICT (id) DO UPDATE SET {counter} = {counter} + 1; END"
+            ).execute_if(dialect="sqlite"),
+        )
+
+
+def schema_is_current(engine):
+    # False if the database is missing any table, column or index this version
+    # of the app defines, e.g. one built before they were added. create_all only
+    # creates missing tables, so such a database has to be dropped and rebuilt
+    inspector = inspect(engine)
+    table_names = set(inspector.get_table_names())
+    if engine.dialect.name == "sqlite" and "games_search" not in table_names:
+        return False
+    for table in metadata.sorted_tables:
+        if table.name not in table_names:
+            return False
+        column_names = {column["name"] for column in inspector.get_columns(table.name)}
+        if not {column.name for column in table.columns} <= column_names:
+            return False
+        index_names = {index["name"] for index in inspector.get_indexes(table.name)}
+        if not {index.name for index in table.indexes} <= index_names:
+            return False
+    return True
+
 
 def map_model_to_tables():
     mapper(
@@ -115,13 +222,20 @@ def map_model_to_tables():
             "_Game__game_title": games_table.c.game_title,
             "_Game__price": games_table.c.game_price,
             "_Game__release_date": games_table.c.release_date,
+            "_Game__release_date_ordinal": games_table.c.release_date_ordinal,
             "_Game__description": games_table.c.game_description,
             "_Game__image_url": games_table.c.game_image_url,
             "_Game__website_url": games_table.c.game_website_url,
             "_Game__publisher": relationship(Publisher),
-            "_Game__genres": relationship(Genre, secondary=games_genre_table),
+            "_Game__genres": relationship(
+                Genre,
+                secondary=games_genre_table,
+                order_by=genres_table.c.genre_name,
+            ),
+            # loaded here but written through Review's own relationships, so that
+            # building a Review doesn't add it to these hashed collections half made
             "_Game__reviews": relationship(
-                Review, back_populates="_Review__game"
+                Review, viewonly=True, collection_class=ReviewCollection
             ),
         },
     )
@@ -138,12 +252,11 @@ def map_model_to_tables():
         Review,
         reviews_table,
         properties={
-            "_Review__user": relationship(
-                User, back_populates="_User__reviews"
-            ),
-            "_Review__game": relationship(
-                Game, back_populates="_Game__reviews"
-            ),
+            "_Review__user": relationship(User),
+            "_Review__game": relationship(Game),
+            # the foreign keys as plain values too, which Review hashes on
+            "_Review__user_name": reviews_table.c.user_name,
+            "_Review__game_id": reviews_table.c.game_id,
             "_Review__rating": reviews_table.c.rating,
             "_Review__comment": reviews_table.c.comment,
         },
@@ -157,7 +270,10 @@ def map_model_to_tables():
                 User, back_populates="_User__wishlist"
             ),
             "_Wishlist__list_of_games": relationship(
-                Game, secondary=wishlist_game_table
+                Game,
+                secondary=wishlist_game_table,
+                collection_class=GameCollection,
+                order_by=wishlist_game_table.c.id,
             ),
         },
     )
@@ -170,14 +286,29 @@ def map_model_to_tables():
             "_User__password": users_table.c.password,
             "_User__bio": users_table.c.bio,
             "_User__reviews": relationship(
-                Review, back_populates="_Review__user"
+                Review, viewonly=True, collection_class=ReviewCollection
             ),
             "_User__favourite_games": relationship(
                 Game,
                 secondary=user_favouritesgames_table,
+                collection_class=GameCollection,
+                order_by=user_favouritesgames_table.c.id,
             ),
             "_User__wishlist": relationship(
                 Wishlist, back_populates="_Wishlist__user", uselist=False
             ),
         },
     )
+
+    # Game caches its genres as a sorted tuple, which goes stale whenever the
+    # ORM loads, expires or edits the genres collection directly
+    for instance_event in ("load", "refresh", "expire"):
+        event.listen(Game, instance_event, _reset_genres_cache)
+    for collection_event in ("append", "remove", "init_collection"):
+        event.listen(Game._Game__genres, collection_event, _reset_genres_cache)
+
+
+def _reset_genres_cache(game, *args):
+    # expire can fire for identity map entries whose object was already collected
+    if game is not None:
+        game.reset_genres_cache()
@@ -1,5 +1,5 @@
 import abc
-from typing import List
+from typing import List, Sequence
 
 from games.domainmodel.model import Game, User, Genre, Review, Wishlist
 
@@ -39,7 +39,36 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_games(self) -> List[Game]:
+    def add_games(self, games: List[Game]):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_games(self) -> Sequence[Game]:
+        # games in name order; a list, or a read-only sequence that compares
+        # equal to the list of the same games
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def search_game_ids(self, query, genre=None, publisher=None, **filters) -> List[int]:
+        # returns the ids of every game search_games would match, in the same
+        # order, without loading the games themselves
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_games_by_ids(self, game_ids) -> List[Game]:
+        # returns the games with these ids in the same order, skipping unknown ids
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_review_counts(self):
+        # returns game id -> number of reviews, for games with any reviews
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_catalogue_version(self):
+        # returns a (games, reviews) pair of versions. The first changes when
+        # games are added or edited and the second when reviews are, so
+        # anything cached from search results can tell it is stale
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -55,15 +84,37 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_games_by_genre(self, genre):
+    def get_games_by_genre(self, genre) -> Sequence[Game]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_page(self, sort_mode, offset, limit, genre=None):
+        # returns (games on the page, total number of games matching)
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_top_games(self, sort_mode, k) -> List[Game]:
+        # the first k games of the catalogue in the given sort order
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_sublist(self, super_list, l):
+    def search_games(
+        self, query, genre=None, publisher=None, offset=0, limit=None, **filters
+    ):
+        # returns (matching games, total number of matches). Games must have
+        # genre, and filters may also be given as keywords:
+        # with_genres, any_genres, without_genres: games must have every one of
+        # with_genres, at least one of any_genres if it is given, and none of
+        # without_genres.
+        # min_price, max_price, released_from, released_to: inclusive price and
+        # release date (datetime.date) ranges, None leaves that end open.
+        # sort_mode: one of name, date, latest, price or rating, best matches
+        # first if not given.
+        # game_ids: limits the search to those games
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_sorted_dataset(self, sort_mode, l) -> list:
+    def get_sorted_dataset(self, sort_mode, l) -> Sequence[Game]:
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -71,7 +122,8 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_game(self, game_id) -> Game:
+    def get_game(self, game_id, with_reviews=False) -> Game:
+        # with_reviews loads the game's reviews and their users up front
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -29,9 +29,7 @@ def populate(repo: AbstractRepository, csv_path: str):
     reader = GameFileCSVReader(csv_path + "games.csv")
 
     reader.read_csv_file()
-    games = reader.dataset_of_games
-    for game in games:
-        repo.add_game(game)
+    repo.add_games(reader.dataset_of_games)
     load_users(repo, csv_path)
     load_reviews(repo, csv_path)
 
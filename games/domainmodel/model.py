@@ -1,4 +1,6 @@
+from bisect import insort
 from datetime import datetime
+from itertools import islice
 
 
 class Publisher:
@@ -77,11 +79,13 @@ class Game:
 
         self.__price = None
         self.__release_date = None
+        self.__release_date_ordinal = None
         self.__description = None
         self.__image_url = None
         self.__website_url = None
         self.__genres: list = []
-        self.__reviews: list = []
+        self.__sorted_genres: tuple = ()
+        self.__reviews = ReviewCollection()
         self.__publisher = None
 
     @property
@@ -98,13 +102,17 @@ class Game:
     def add_review(self, new_review):
         if not isinstance(new_review, Review) or new_review in self.__reviews:
             return
-        self.__reviews.append(new_review)
+        self.__reviews.add(new_review)
 
     def remove_review(self, review):
         if not isinstance(review, Review) or review not in self.__reviews:
             return
         self.__reviews.remove(review)
 
+    def recount_review(self, review):
+        # called when a review's rating changes
+        self.__reviews.recount(review)
+
     @property
     def game_id(self):
         return self.__game_id
@@ -139,13 +147,23 @@ class Game:
     def release_date(self, release_date: str):
         if isinstance(release_date, str):
             try:
-                datetime.strptime(release_date, "%b %d, %Y")
+                parsed_date = datetime.strptime(release_date, "%b %d, %Y")
                 self.__release_date = release_date
+                self.__release_date_ordinal = parsed_date.toordinal()
             except ValueError:
                 raise ValueError("Release date must be in 'Oct 21, 2008' format!")
         else:
             raise ValueError("Release date must be a string in 'Oct 21, 2008' format!")
 
+    @property
+    def release_date_ordinal(self) -> int:
+        # release date as a day number, so date sorts never re-parse the string
+        ordinal = self.__release_date_ordinal
+        if ordinal is None and self.__release_date is not None:
+            # rows written straight into the games table may leave the ordinal column empty
+            ordinal = datetime.strptime(self.__release_date, "%b %d, %Y").toordinal()
+        return ordinal
+
     @property
     def description(self):
         return self.__description
@@ -181,22 +199,39 @@ class Game:
 
     @property
     def reviews(self) -> list:
-        return self.__reviews
+        return list(self.__reviews)
+
+    @property
+    def average_rating(self):
+        return self.__reviews.average_rating
+
+    @property
+    def rating_histogram(self) -> tuple:
+        return self.__reviews.rating_histogram
 
     @property
-    def genres(self) -> list:
-        return sorted(self.__genres, key=lambda x: x.genre_name)
+    def genres(self) -> tuple:
+        # __genres is kept in name order; the tuple is only rebuilt when it changes
+        if self.__sorted_genres is None:
+            self.__sorted_genres = tuple(self.__genres)
+        return self.__sorted_genres
+
+    def reset_genres_cache(self):
+        # for when the ORM loads or changes __genres without going through add_genre
+        self.__sorted_genres = None
 
     def add_genre(self, genre: Genre):
         if not isinstance(genre, Genre) or genre in self.__genres:
             return
-        self.__genres.append(genre)
+        insort(self.__genres, genre)
+        self.__sorted_genres = tuple(self.__genres)
 
     def remove_genre(self, genre: Genre):
         if not isinstance(genre, Genre):
             return
         try:
             self.__genres.remove(genre)
+            self.__sorted_genres = tuple(self.__genres)
         except ValueError:
             print(f"Could not find {genre} in list of genres.")
             pass
@@ -230,8 +265,8 @@ class User:
         else:
             raise ValueError("Password not valid!")
 
-        self.__reviews: list[Review] = []
-        self.__favourite_games: list[Game] = []
+        self.__reviews = ReviewCollection()
+        self.__favourite_games = GameCollection()
         self.__wishlist = Wishlist(self)
         self.__bio = "Write a bio to introduce yourself!"
 
@@ -255,7 +290,7 @@ class User:
 
     @property
     def reviews(self) -> list:
-        return self.__reviews
+        return list(self.__reviews)
 
     @property
     def wishlist(self) -> str:
@@ -268,21 +303,33 @@ class User:
     def add_review(self, new_review):
         if not isinstance(new_review, Review) or new_review in self.__reviews:
             return
-        self.__reviews.append(new_review)
+        self.__reviews.add(new_review)
 
     def remove_review(self, review):
         if not isinstance(review, Review) or review not in self.__reviews:
             return
         self.__reviews.remove(review)
 
+    def recount_review(self, review):
+        # called when a review's rating changes
+        self.__reviews.recount(review)
+
+    def has_reviewed(self, game) -> bool:
+        if not isinstance(game, Game):
+            return False
+        return self.__reviews.has_review(self.__username, game.game_id)
+
     @property
     def favourite_games(self) -> list:
-        return self.__favourite_games
+        return list(self.__favourite_games)
+
+    def is_favourite_game(self, game) -> bool:
+        return game in self.__favourite_games
 
     def add_favourite_game(self, game):
         if not isinstance(game, Game) or game in self.__favourite_games:
             return
-        self.__favourite_games.append(game)
+        self.__favourite_games.add(game)
 
     def remove_favourite_game(self, game):
         if not isinstance(game, Game) or game not in self.__favourite_games:
@@ -318,6 +365,9 @@ class Review:
         if not isinstance(game, Game):
             raise ValueError("Game must be an instance of Game class")
         self.__game = game
+        # kept alongside user and game so hashing a review never has to load them
+        self.__user_name = user.username
+        self.__game_id = game.game_id
 
         if not isinstance(rating, int) or not 0 <= rating <= 5:
             raise ValueError("Rating must be an integer between 0 and 5")
@@ -343,6 +393,11 @@ class Review:
     def user(self) -> User:
         return self.__user
 
+    @property
+    def key(self) -> tuple:
+        # (reviewer's username, game id)
+        return self.__user_name, self.__game_id
+
     @comment.setter
     def comment(self, new_text):
         if isinstance(new_text, str):
@@ -354,6 +409,9 @@ class Review:
     def rating(self, new_rating: int):
         if isinstance(new_rating, int) and 0 <= new_rating <= 5:
             self.__rating = new_rating
+            # the review collections of the game and user keep rating totals
+            self.__game.recount_review(self)
+            self.__user.recount_review(self)
         else:
             raise ValueError("Rating must be an integer between 0 and 5")
 
@@ -365,6 +423,109 @@ class Review:
             return False
         return other.user == self.__user and other.game == self.__game and other.comment == self.__comment
 
+    def __hash__(self):
+        # the comment can be edited, so only the reviewer and game make up the hash
+        return hash(self.key)
+
+
+class ReviewCollection:
+    # insertion-ordered reviews with constant time add, remove and "already reviewed"
+    # checks. Game and User keep their reviews in one, and the ORM mapping loads
+    # their review relationships into one.
+    def __init__(self):
+        # review -> the rating it is counted with in the running totals below
+        self.__reviews = {}
+        self.__count_by_key = {}
+        self.__rating_total = 0
+        self.__rating_counts = [0] * 6
+
+    def add(self, review: Review):
+        if review in self.__reviews:
+            return
+        self.__reviews[review] = review.rating
+        key = review.key
+        self.__count_by_key[key] = self.__count_by_key.get(key, 0) + 1
+        self.__rating_total += review.rating
+        self.__rating_counts[review.rating] += 1
+
+    def remove(self, review: Review):
+        counted_rating = self.__reviews.pop(review)
+        key = review.key
+        self.__count_by_key[key] -= 1
+        if self.__count_by_key[key] == 0:
+            del self.__count_by_key[key]
+        self.__rating_total -= counted_rating
+        self.__rating_counts[counted_rating] -= 1
+
+    def recount(self, review: Review):
+        # moves a review whose rating changed to its new rating in the totals
+        if review not in self.__reviews:
+            return
+        counted_rating = self.__reviews[review]
+        self.__rating_total += review.rating - counted_rating
+        self.__rating_counts[counted_rating] -= 1
+        self.__rating_counts[review.rating] += 1
+        self.__reviews[review] = review.rating
+
+    def discard(self, review: Review):
+        if review in self.__reviews:
+            self.remove(review)
+
+    def has_review(self, username: str, game_id: int) -> bool:
+        return (username, game_id) in self.__count_by_key
+
+    @property
+    def average_rating(self):
+        if len(self.__reviews) == 0:
+            return None
+        return self.__rating_total / len(self.__reviews)
+
+    @property
+    def rating_histogram(self) -> tuple:
+        # number of reviews with each rating from 0 to 5
+        return tuple(self.__rating_counts)
+
+    def __contains__(self, review):
+        return review in self.__reviews
+
+    def __iter__(self):
+        return iter(self.__reviews)
+
+    def __len__(self):
+        return len(self.__reviews)
+
+    def __repr__(self):
+        return f"<ReviewCollection {list(self.__reviews)}>"
+
+
+class GameCollection:
+    # insertion-ordered set of games with constant time add, remove and membership
+    # checks, used for wishlists and favourites (and by the ORM mapping for both)
+    def __init__(self):
+        self.__games = {}
+
+    def add(self, game: Game):
+        self.__games[game] = None
+
+    def remove(self, game: Game):
+        del self.__games[game]
+
+    def discard(self, game: Game):
+        self.__games.pop(game, None)
+
+    def __contains__(self, game):
+        return game in self.__games
+
+    def __iter__(self):
+        # a new iterator each time, so concurrent iterations don't share a cursor
+        return iter(self.__games)
+
+    def __len__(self):
+        return len(self.__games)
+
+    def __repr__(self):
+        return f"<GameCollection {list(self.__games)}>"
+
 
 class Wishlist:
     def __init__(self, user: User):
@@ -372,11 +533,11 @@ class Wishlist:
             raise ValueError("User must be an instance of User class")
         self.__user = user
 
-        self.__list_of_games = []
+        self.__list_of_games = GameCollection()
     
     @property
     def list_of_games(self):
-        return self.__list_of_games
+        return list(self.__list_of_games)
 
     def size(self):
         size_wishlist = len(self.__list_of_games)
@@ -385,13 +546,10 @@ class Wishlist:
 
     def add_game(self, game: Game):
         if isinstance(game, Game) and game not in self.__list_of_games:
-            self.__list_of_games.append(game)
+            self.__list_of_games.add(game)
 
     def first_game_in_list(self):
-        if len(self.__list_of_games) > 0:
-            return self.__list_of_games[0]
-        else:
-            return None
+        return next(iter(self.__list_of_games), None)
 
     def remove_game(self, game):
         if isinstance(game, Game) and game in self.__list_of_games:
@@ -399,17 +557,12 @@ class Wishlist:
 
     def select_game(self, index):
         if 0 <= index < len(self.__list_of_games):
-            return self.__list_of_games[index]
+            return next(islice(self.__list_of_games, index, None))
         else:
             return None
 
-    def __iter__(self):
-        self.__current = 0
-        return self
+    def __contains__(self, game):
+        return game in self.__list_of_games
 
-    def __next__(self):
-        if self.__current >= len(self.__list_of_games):
-            raise StopIteration
-        else:
-            self.__current += 1
-            return self.__list_of_games[self.__current - 1]
+    def __iter__(self):
+        return iter(self.__list_of_games)
@@ -53,9 +53,12 @@ def games():
     if games_per_page is None:
         games_per_page = 12
 
-    sorted_games = services.get_sorted_games(sort_type, repo.repo_instance)
-    sublist = services.get_sublist(
-        sorted_games, games_per_page, repo.repo_instance
+    current_page = request.args.get("page", type=int, default=1)
+    if not current_page or current_page < 1:
+        current_page = 1
+
+    games_on_page = services.get_page_of_games(
+        sort_type, current_page, games_per_page, repo.repo_instance
     )
     dataset_of_genres = utilities.get_all_genres(repo.repo_instance)
     number_of_pages = services.get_number_of_pages(
@@ -64,16 +67,12 @@ def games():
 
     username = utilities.get_username()
 
-    current_page = request.args.get("page", type=int, default=1)
-    if not current_page:
-        current_page = 1
-
     return render_template(
         "games.html",
         dataset_of_genres=dataset_of_genres,
         page=current_page,
         last=number_of_pages,
-        divided_list=sublist,
+        games=games_on_page,
         sort_type=sort_type,
         games_per_page=games_per_page,
         username=username,
@@ -86,10 +85,9 @@ def view_game(game_id):
 
     if game_id is not None:
         dataset_of_genres = utilities.get_all_genres(repo.repo_instance)
-        dataset_of_games = utilities.get_all_games(repo.repo_instance)
         username = utilities.get_username()
         try:
-            game = utilities.get_game(game_id, repo.repo_instance)
+            game = utilities.get_game(game_id, repo.repo_instance, with_reviews=True)
 
             if game is None:
                 abort(404)
@@ -115,6 +113,7 @@ def view_game(game_id):
             )
             total_pages = search_services.get_total_pages(sorted_reviews, 3)
             avg_rating = services.get_game_average_reviews(game)
+            rating_distribution = services.get_rating_distribution(game)
 
             return render_template(
                 "game_info.html",
@@ -128,6 +127,7 @@ def view_game(game_id):
                 page=page,
                 total_pages=total_pages,
                 avg_rating=avg_rating,
+                rating_distribution=rating_distribution,
             )
         except ValueError:
             return redirect("")
@@ -149,12 +149,11 @@ def review_game(game_id):
     if form.validate_on_submit():
         comment_text = form.review_comment.data
         rating = form.rating.data
-        for i in range(len(current_user.reviews)):
-            if current_user.reviews[i].game == game:
-                print("already reviewed")
-                return redirect(
-                    url_for("games_bp.view_game", game_id=game.game_id)
-                )
+        if current_user.has_reviewed(game):
+            print("already reviewed")
+            return redirect(
+                url_for("games_bp.view_game", game_id=game.game_id)
+            )
 
         review = Review(current_user, game, rating, comment_text)
         services.add_review(review, repo.repo_instance)
@@ -5,16 +5,15 @@ import math
 from games.utilities import utilities
 
 
-def get_sorted_games(sort_type, repo: AbstractRepository):
-    return repo.get_sorted_dataset(sort_type)
-
-
 # def get_game(game_id, repo: AbstractRepository):
 #     return repo.get_game(game_id)
 
 
-def get_sublist(super_list, length, repo: AbstractRepository):
-    return repo.get_sublist(super_list, length)
+def get_page_of_games(sort_type, page, games_per_page, repo: AbstractRepository):
+    games, _ = repo.get_page(
+        sort_type, (page - 1) * games_per_page, games_per_page
+    )
+    return games
 
 
 def get_number_of_pages(games_per_page, repo: AbstractRepository):
@@ -43,7 +42,7 @@ def add_to_favourites(user: User, game: Game, repo: AbstractRepository):
 
 
 def in_favourites(user: User, game: Game):
-    return game in user.favourite_games
+    return user.is_favourite_game(game)
 
 
 # def remove_from_favourites(user: User, game: Game):
@@ -59,9 +58,14 @@ def add_review(review: Review, repo: AbstractRepository):
 
 
 def get_game_average_reviews(game: Game):
-    total = 0
-    for review in game.reviews:
-        total = total + review.rating
-    if total == 0:
-        return None
-    return total / len(game.reviews)
+    return game.average_rating
+
+
+def get_rating_distribution(game: Game):
+    # (rating, number of reviews, percentage of reviews) from 5 stars down to 0
+    histogram = game.rating_histogram
+    total = sum(histogram)
+    return [
+        (rating, histogram[rating], 100 * histogram[rating] / total if total else 0)
+        for rating in range(5, -1, -1)
+    ]
@@ -32,19 +32,17 @@ def genre_games(name):
     if method is None:
         method = "name"
 
+    page = request.args.get("page", type=int, default=1)
+    if not page or page < 1:
+        page = 1
+
     dataset_of_genres = services.get_genres(repo.repo_instance)
-    sorted_list = services.get_sorted_games(method, name, repo.repo_instance)
-    if sorted_list == []:
+    games_on_page, length = services.get_page_of_games(method, name, page, num, repo.repo_instance)
+    if length == 0:
         abort(404)
-    genre_list = services.get_sublist(sorted_list, num, repo.repo_instance)
-    length = len(genre_list)
 
     username = utilities.get_username()
 
-    page = request.args.get("page", type=int, default=1)
-    if not page:
-        page = 1
-
     return render_template(
-        "genres.html", dataset_of_genres=dataset_of_genres, genre=Genre(name), games=genre_list[page - 1], page=page, last=length, sort_type=method, games_per_page=num, username=username
+        "genres.html", dataset_of_genres=dataset_of_genres, genre=Genre(name), games=games_on_page, page=page, last=length, sort_type=method, games_per_page=num, username=username
     )
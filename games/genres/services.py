@@ -1,13 +1,12 @@
-from games.adapters.repository import AbstractRepository
-
+import math
 
-def get_sorted_games(method, name, repo: AbstractRepository):
-    games_by_genre = repo.get_games_by_genre(name)
-    return repo.get_sorted_dataset(method, games_by_genre)
+from games.adapters.repository import AbstractRepository
 
 
-def get_sublist(super_list, length, repo: AbstractRepository):
-    return repo.get_sublist(super_list, length)
+def get_page_of_games(method, name, page, length, repo: AbstractRepository):
+    # returns (games on the page, number of pages)
+    games, total = repo.get_page(method, (page - 1) * length, length, name)
+    return games, math.ceil(total / length)
 
 
 def get_genres(repo: AbstractRepository):
@@ -6,14 +6,17 @@ from flask import Blueprint, render_template
 
 home_blueprint = Blueprint("home_bp", __name__)
 
+# number of games in each slider on the home page
+games_shown = 5
+
 
 @home_blueprint.route("/")
 def home():
     utilities.check_valid_session(repo.repo_instance)
 
-    lastest_games = services.get_sorted_games("latest", repo.repo_instance)
-    cheapest_games = services.get_sorted_games("price", repo.repo_instance)
-    oldest_games = services.get_sorted_games("date", repo.repo_instance)
+    lastest_games = services.get_top_games("latest", games_shown, repo.repo_instance)
+    cheapest_games = services.get_top_games("price", games_shown, repo.repo_instance)
+    oldest_games = services.get_top_games("date", games_shown, repo.repo_instance)
 
     section_dict = {"Featured games": lastest_games, "Free-to-play": cheapest_games, "Classic": oldest_games}
 
@@ -5,5 +5,5 @@ def get_genres(repo: AbstractRepository):
     return repo.get_genres()
 
 
-def get_sorted_games(method, repo: AbstractRepository):
-    return repo.get_sorted_dataset(method)
+def get_top_games(method, k, repo: AbstractRepository):
+    return repo.get_top_games(method, k)
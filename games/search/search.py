@@ -1,4 +1,6 @@
-from flask import Blueprint, render_template, request
+from datetime import date
+
+from flask import Blueprint, jsonify, render_template, request
 from games import Genre
 from games.domainmodel.model import Publisher
 import games.adapters.repository as repo
@@ -12,11 +14,10 @@ search_blueprint = Blueprint("search_bp", __name__)
 def search():
     utilities.check_valid_session(repo.repo_instance)
     
-    games_list = services.get_all_games(repo.repo_instance)
     genres = services.get_all_genres(repo.repo_instance)
     publishers = services.get_all_publishers(repo.repo_instance)
     username = utilities.get_username()
-    return render_template("search.html", games_list=games_list, dataset_of_genres=genres, dataset_of_publishers=publishers, page=0, total_pages=0, username=username)
+    return render_template("search.html", dataset_of_genres=genres, dataset_of_publishers=publishers, page=0, total_pages=0, username=username)
 
 
 @search_blueprint.route("/search", methods=["GET"])
@@ -26,14 +27,41 @@ def perform_search():
     search_query = request.args.get("query", "").lower()
     selected_genre = Genre(request.args.get("genre", ""))
     selected_publisher = Publisher(request.args.get("publisher", ""))
-    matching_games = services.search_games(search_query, selected_genre, selected_publisher, repo.repo_instance)
-
     page = request.args.get("page", type=int, default=1)
-    results_on_current_page = services.get_results_for_page(matching_games, page, 20)
-    total_pages = services.get_total_pages(matching_games, 20)
+    if not page or page < 1:
+        page = 1
+    # multi-genre filters: all of with_genre, any of any_genre, none of without_genre
+    with_genres = request.args.getlist("with_genre")
+    any_genres = request.args.getlist("any_genre")
+    without_genres = request.args.getlist("without_genre")
+    # inclusive price and release date ranges, malformed bounds are ignored
+    min_price = request.args.get("min_price", type=float)
+    max_price = request.args.get("max_price", type=float)
+    released_from = request.args.get("released_from", type=date.fromisoformat)
+    released_to = request.args.get("released_to", type=date.fromisoformat)
+    # relevance order unless another sort method is picked
+    sort_mode = request.args.get("method") or None
+    # typo tolerant title matching
+    fuzzy = request.args.get("fuzzy") == "on"
+    results_on_current_page, total_pages = services.search_games_for_page(
+        search_query, selected_genre, selected_publisher, page, 20, repo.repo_instance, fuzzy=fuzzy,
+        with_genres=with_genres, any_genres=any_genres, without_genres=without_genres,
+        min_price=min_price, max_price=max_price, released_from=released_from, released_to=released_to,
+        sort_mode=sort_mode
+    )
 
     username = utilities.get_username()
 
     genres = services.get_all_genres(repo.repo_instance)
     publishers = services.get_all_publishers(repo.repo_instance)
     return render_template("search.html", games=results_on_current_page, dataset_of_publishers=publishers, dataset_of_genres=genres, page=page, total_pages=total_pages, username=username)
+
+
+@search_blueprint.route("/suggest", methods=["GET"])
+def suggest():
+    # title completions as JSON for the search box; called on every keystroke,
+    # so it skips the session check and template rendering
+    suggestions = services.suggest_titles(
+        request.args.get("q", ""), request.args.get("n", type=int), repo.repo_instance
+    )
+    return jsonify(suggestions)
@@ -1,4 +1,197 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
 from games.adapters.repository import AbstractRepository
+from games.utilities.trigram_index import TrigramIndex
+
+
+class CatalogueWatcher:
+    # remembers the repository and catalogue version something was built from.
+    # part picks the games or reviews half of the version, None watches both
+    GAMES = 0
+    REVIEWS = 1
+
+    def __init__(self, part=None):
+        self.__part = part
+        self.__repo = None
+        self.__version = None
+
+    def changed(self, repo: AbstractRepository, version):
+        # version is repo.get_catalogue_version(), read once by the caller
+        if self.__part is not None:
+            version = version[self.__part]
+        if repo is self.__repo and version == self.__version:
+            return False
+        self.__repo = repo
+        self.__version = version
+        return True
+
+
+class SearchResultCache:
+    # the match lists of the most recently used searches, as game ids, so paging
+    # through a search only loads the games on each page. Entries are dropped
+    # when the repository or its catalogue version changes. Shared by the
+    # request threads, so every use holds the lock
+    def __init__(self, max_size=128):
+        self.__max_size = max_size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__catalogue = CatalogueWatcher()
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, repo: AbstractRepository, key):
+        version = repo.get_catalogue_version()
+        with self.__lock:
+            if self.__catalogue.changed(repo, version):
+                self.__entries.clear()
+            game_ids = self.__entries.get(key)
+            if game_ids is None:
+                self.__misses += 1
+                return None
+            self.__hits += 1
+            self.__entries.move_to_end(key)
+            return game_ids
+
+    def put(self, repo: AbstractRepository, key, game_ids):
+        version = repo.get_catalogue_version()
+        with self.__lock:
+            if self.__catalogue.changed(repo, version):
+                self.__entries.clear()
+            self.__entries[key] = game_ids
+            self.__entries.move_to_end(key)
+            if len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+    @property
+    def stats(self):
+        with self.__lock:
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "size": len(self.__entries),
+                "max_size": self.__max_size,
+            }
+
+
+search_cache = SearchResultCache()
+
+
+class TitleSuggester:
+    # lowercased titles in sorted order, so the completions of a prefix are one
+    # run found with bisect, ranked by number of reviews. The titles are only
+    # reloaded when games are added; new reviews just refetch the review counts,
+    # and drop the remembered top completions of one and two character
+    # prefixes, whose runs are too long to rank on every keystroke
+    short_prefix_length = 2
+
+    def __init__(self, max_suggestions=10):
+        self.__max_suggestions = max_suggestions
+        self.__lock = threading.Lock()
+        self.__titles_version = CatalogueWatcher(CatalogueWatcher.GAMES)
+        self.__reviews_version = CatalogueWatcher(CatalogueWatcher.REVIEWS)
+        self.__titles = []
+        # (title, game id), lined up with __titles
+        self.__games = []
+        self.__review_counts = {}
+        self.__top_by_short_prefix = {}
+
+    def suggest(self, repo: AbstractRepository, prefix, limit=None):
+        prefix = prefix.strip().lower()
+        if limit is None or limit > self.__max_suggestions:
+            limit = self.__max_suggestions
+        if not prefix or limit < 1:
+            return []
+        version = repo.get_catalogue_version()
+        with self.__lock:
+            if self.__titles_version.changed(repo, version):
+                self.__load_titles(repo)
+            if self.__reviews_version.changed(repo, version):
+                self.__review_counts = repo.get_review_counts()
+                self.__top_by_short_prefix = {}
+            if len(prefix) > self.short_prefix_length:
+                best = self.__best(prefix, limit)
+            else:
+                if prefix not in self.__top_by_short_prefix:
+                    self.__top_by_short_prefix[prefix] = self.__best(
+                        prefix, self.__max_suggestions
+                    )
+                best = self.__top_by_short_prefix[prefix][:limit]
+        return [{"game_id": game_id, "title": title} for title, game_id in best]
+
+    def __best(self, prefix, limit):
+        start = bisect_left(self.__titles, prefix)
+        end = bisect_left(self.__titles, prefix + "\U0010ffff", start)
+        return heapq.nsmallest(
+            limit,
+            self.__games[start:end],
+            key=lambda game: (-self.__review_counts.get(game[1], 0), game[0]),
+        )
+
+    def __load_titles(self, repo):
+        rows = sorted((game.title.lower(), game.title, game.game_id) for game in repo.get_games())
+        self.__titles = [row[0] for row in rows]
+        self.__games = [row[1:] for row in rows]
+        self.__top_by_short_prefix = {}
+
+
+title_suggester = TitleSuggester()
+
+
+def suggest_titles(prefix, limit, repo: AbstractRepository):
+    return title_suggester.suggest(repo, prefix, limit)
+
+
+def normalize_title(text):
+    # lowercase words separated by single spaces, padded so the first and last
+    # words have trigrams of their own
+    return " " + " ".join(re.findall(r"\w+", text.lower())) + " "
+
+
+class FuzzyTitleMatcher:
+    # trigram index over normalized titles for typo tolerant search, built from
+    # the repository and rebuilt when games are added
+    def __init__(self, max_results=100, candidate_budget=500):
+        self.__max_results = max_results
+        self.__candidate_budget = candidate_budget
+        self.__index = TrigramIndex()
+        self.__lock = threading.Lock()
+        self.__titles_version = CatalogueWatcher(CatalogueWatcher.GAMES)
+
+    def match(self, repo: AbstractRepository, query):
+        # returns the ids of the closest titles, best first
+        version = repo.get_catalogue_version()
+        with self.__lock:
+            if self.__titles_version.changed(repo, version):
+                self.__index = TrigramIndex()
+                for game in repo.get_games():
+                    self.__index.add(game.game_id, normalize_title(game.title))
+            return self.__index.similar(
+                normalize_title(query), self.__max_results, self.__candidate_budget
+            )
+
+
+fuzzy_title_matcher = FuzzyTitleMatcher()
+
+
+def search_cache_key(query, genre_name, publisher_name, filters):
+    # searches differing only in case, surrounding spaces or the order of
+    # genre lists share one entry
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(set(value)))
+        normalized.append((name, value))
+    return query.strip().lower(), genre_name, publisher_name, tuple(normalized)
 
 
 def get_all_games(repo: AbstractRepository):
@@ -33,12 +226,57 @@ def get_total_pages(matching_games, amount):
 
 
 def search_games(query, selected_genre, selected_publisher, repo: AbstractRepository):
-    all_games = repo.get_games()
-    matching_games = get_matching_games(query, selected_genre, selected_publisher, all_games)
+    matching_games, _ = repo.search_games(query, selected_genre.genre_name, selected_publisher.publisher_name)
 
     return matching_games
 
 
+def search_games_for_page(query, selected_genre, selected_publisher, page, amount, repo: AbstractRepository,
+                          fuzzy=False, **filters):
+    # returns (games on the page, total number of pages). filters are the genre,
+    # price, release date and sort keyword arguments of AbstractRepository.search_games.
+    # fuzzy matches the query against titles allowing for typos
+    genre_name = selected_genre.genre_name
+    publisher_name = selected_publisher.publisher_name
+    fuzzy = fuzzy and bool(query.strip())
+    key = search_cache_key(query, genre_name, publisher_name, dict(filters, fuzzy=fuzzy))
+    start = (page - 1) * amount
+    game_ids = search_cache.get(repo, key)
+    if game_ids is None:
+        if fuzzy:
+            game_ids = fuzzy_search_game_ids(query, genre_name, publisher_name, repo, **filters)
+        else:
+            game_ids = repo.search_game_ids(query.strip().lower(), genre_name, publisher_name, **filters)
+        search_cache.put(repo, key, game_ids)
+    games = repo.get_games_by_ids(game_ids[start:start + amount])
+    total_pages = (len(game_ids) + amount - 1) // amount
+
+    return games, total_pages
+
+
+def fuzzy_search_game_ids(query, genre_name, publisher_name, repo: AbstractRepository, sort_mode=None, **filters):
+    # closest titles first, or in sort_mode order if one is given, keeping only
+    # games that pass the other filters. Only the bounded list of fuzzy matches
+    # is filtered and sorted, never the whole catalogue
+    game_ids = fuzzy_title_matcher.match(repo, query)
+    filtered = genre_name is not None or publisher_name is not None or any(
+        value not in (None, [], ()) for value in filters.values()
+    )
+    if not game_ids or (not filtered and sort_mode is None):
+        return game_ids
+    allowed = repo.search_game_ids(
+        "", genre_name, publisher_name, game_ids=game_ids, sort_mode=sort_mode, **filters
+    )
+    if sort_mode is not None:
+        return allowed
+    allowed = set(allowed)
+    return [game_id for game_id in game_ids if game_id in allowed]
+
+
+def get_search_cache_stats():
+    return search_cache.stats
+
+
 def get_results_for_page(matching_games, page, amount):
     per_page = amount
     start_idx = (page - 1) * per_page
@@ -3,15 +3,27 @@ from games.domainmodel.model import User
 import games.utilities.utilities as utilities
 import math
 
+from itertools import chain, islice
+
 
 def get_wishlist(user: User):
     return user.wishlist.list_of_games
 
 
+def get_wishlist_size(user: User):
+    return user.wishlist.size() or 0
+
+
 def get_favourite_games(user: User):
     return user.favourite_games
 
 
+def get_page_of_list(games, page, games_per_page):
+    # None is placeholder for the add button, so it takes the first slot of page 1
+    start = (page - 1) * games_per_page
+    return list(islice(chain([None], games), start, start + games_per_page))
+
+
 def get_reviewed_games(user: User):
     reviewed_games = []
     reviews = user.reviews
@@ -24,6 +36,11 @@ def get_number_of_pages(games_per_page, super_list):
     return math.ceil(len(super_list) / games_per_page)
 
 
+def get_number_of_list_pages(games_per_page, list_size):
+    # one extra slot for the add button
+    return math.ceil((list_size + 1) / games_per_page)
+
+
 def get_bio(user: User):
     return user.bio
 
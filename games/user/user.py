@@ -136,28 +136,24 @@ def wishlist_page():
     if user == None:
         return redirect(url_for("auth_bp.login"))
 
-    # None is placeholder for the add button
-
-    games_in_wishlist = [None] + services.get_wishlist(user)
+    current_page = request.args.get("page", type=int, default=1)
+    if not current_page or current_page < 1:
+        current_page = 1
 
-    sublist = utilities.get_sublist(
-        games_in_wishlist, games_per_page, repo.repo_instance
+    sublist = services.get_page_of_list(
+        user.wishlist, current_page, games_per_page
     )
 
-    number_of_pages = services.get_number_of_pages(
-        games_per_page, games_in_wishlist
+    number_of_pages = services.get_number_of_list_pages(
+        games_per_page, services.get_wishlist_size(user)
     )
 
-    current_page = request.args.get("page", type=int, default=1)
-    if not current_page:
-        current_page = 1
-
     return render_template(
         "game_profile_list.html",
         dataset_of_genres=utilities.get_all_genres(repo.repo_instance),
         page=current_page,
         last=number_of_pages,
-        divided_list=sublist,
+        games=sublist,
         games_per_page=games_per_page,
         username=username,
         which_list="wishlist",
@@ -183,28 +179,26 @@ def favourites_page():
     if user == None:
         return redirect(url_for("auth_bp.login"))
 
-    # None is placeholder for the add button
+    current_page = request.args.get("page", type=int, default=1)
+    if not current_page or current_page < 1:
+        current_page = 1
 
-    games_in_favourites = [None] + services.get_favourite_games(user)
+    games_in_favourites = services.get_favourite_games(user)
 
-    sublist = utilities.get_sublist(
-        games_in_favourites, games_per_page, repo.repo_instance
+    sublist = services.get_page_of_list(
+        games_in_favourites, current_page, games_per_page
     )
 
-    number_of_pages = services.get_number_of_pages(
-        games_per_page, games_in_favourites
+    number_of_pages = services.get_number_of_list_pages(
+        games_per_page, len(games_in_favourites)
     )
 
-    current_page = request.args.get("page", type=int, default=1)
-    if not current_page:
-        current_page = 1
-
     return render_template(
         "game_profile_list.html",
         dataset_of_genres=utilities.get_all_genres(repo.repo_instance),
         page=current_page,
         last=number_of_pages,
-        divided_list=sublist,
+        games=sublist,
         games_per_page=games_per_page,
         username=username,
     )
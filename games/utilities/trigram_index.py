@@ -0,0 +1,81 @@
+class TrigramIndex:
+    # inverted index from every three character substring of a text to the
+    # keys whose text contains it. A substring query intersects the posting
+    # sets of its own trigrams and only checks those candidates directly.
+    # Postings are kept up to date as texts are added, so the first search
+    # costs no more than any other
+    def __init__(self):
+        self.__postings = {}
+        self.__texts = {}
+
+    @staticmethod
+    def __trigrams(text):
+        return {text[i : i + 3] for i in range(len(text) - 2)}
+
+    def add(self, key, text):
+        if text is None:
+            return
+        text = text.lower()
+        self.__texts[key] = text
+        for trigram in self.__trigrams(text):
+            self.__postings.setdefault(trigram, set()).add(key)
+
+    def contains(self, key, query):
+        return query.lower() in self.__texts.get(key, "")
+
+    def estimate(self, query):
+        # upper bound on the keys search would have to check for query
+        query = query.lower()
+        if len(query) < 3:
+            return len(self.__texts)
+        return min(
+            len(self.__postings.get(trigram, ()))
+            for trigram in self.__trigrams(query)
+        )
+
+    def search(self, query):
+        # returns the set of keys whose text contains query, ignoring case
+        query = query.lower()
+        if len(query) < 3:
+            # too short to have a trigram, check every stored text instead
+            return {key for key, text in self.__texts.items() if query in text}
+
+        postings = []
+        for trigram in self.__trigrams(query):
+            if trigram not in self.__postings:
+                return set()
+            postings.append(self.__postings[trigram])
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return candidates
+        return {key for key in candidates if query in self.__texts[key]}
+
+    def similar(self, query, limit=20, budget=500, min_score=0.5):
+        # keys whose text shares the most trigrams with query, best first, for
+        # typo tolerant matching. The score is the share of the query's trigrams
+        # a text contains. Rarer trigrams are counted first and no new keys are
+        # taken on once budget keys are being scored, so a query costs its
+        # posting lists rather than an edit distance against every text
+        query_trigrams = self.__trigrams(query.lower())
+        if not query_trigrams:
+            return []
+        counts = {}
+        for trigram in sorted(
+            query_trigrams, key=lambda trigram: len(self.__postings.get(trigram, ()))
+        ):
+            for key in self.__postings.get(trigram, ()):
+                if key in counts:
+                    counts[key] += 1
+                elif len(counts) < budget:
+                    counts[key] = 1
+        needed = min_score * len(query_trigrams)
+        # equal scores go to the shorter text, the closer match
+        best = sorted(
+            (-count, len(self.__texts[key]), key)
+            for key, count in counts.items()
+            if count >= needed
+        )
+        return [key for _, _, key in best[:limit]]
@@ -39,8 +39,8 @@ def check_valid_session(repo: AbstractRepository):
         session.clear()
 
 
-def get_game(game_id, repo: AbstractRepository):
-    return repo.get_game(game_id)
+def get_game(game_id, repo: AbstractRepository, with_reviews=False):
+    return repo.get_game(game_id, with_reviews)
 
 
 def remove_from_wishlist(user: User, game: Game, repo: AbstractRepository):
@@ -49,7 +49,3 @@ def remove_from_wishlist(user: User, game: Game, repo: AbstractRepository):
 
 def remove_from_favourites(user: User, game: Game, repo: AbstractRepository):
     repo.remove_from_favourites(user, game)
-
-
-def get_sublist(super_list, length, repo: AbstractRepository):
-    return repo.get_sublist(super_list, length)
@@ -168,3 +168,55 @@ def test_games_by_genre_result_limit(client):
     assert b"A Blind Legend" in response.data
     assert b"ANARCHY" in response.data
     assert b"Adventure of Great Wolf" not in response.data
+
+
+def test_game_rating_distribution(client):
+    response = client.get("/games/1995240")
+    assert b"Avg Rating: 3.0 / 5.0" in response.data
+    assert b"rating-distribution" in response.data
+
+    response = client.get("/games/855010")
+    assert b"rating-distribution" not in response.data
+
+
+def test_search_results(client):
+    response = client.get("/search/search?query=Call&genre=&publisher=")
+    assert response.status_code == 200
+    assert b"Call of Duty" in response.data
+    assert b"Page 1 of" in response.data
+
+
+def test_search_multi_genre_filters(client):
+    response = client.get("/search/search?query=&with_genre=Action&with_genre=Indie&without_genre=Casual")
+    assert response.status_code == 200
+    assert b"without_genre=Casual" in response.data
+
+
+def test_search_price_and_release_date_filters(client):
+    response = client.get("/search/search?query=&max_price=0&released_from=2020-01-01")
+    assert response.status_code == 200
+    assert b"Page 1 of" in response.data
+
+    # a malformed bound is ignored rather than failing the search
+    response = client.get("/search/search?query=&released_from=not-a-date")
+    assert response.status_code == 200
+
+
+def test_search_sort_method_is_kept_across_pages(client):
+    response = client.get("/search/search?query=the&method=price")
+    assert response.status_code == 200
+    assert b"method=price" in response.data
+
+
+def test_search_suggest(client):
+    response = client.get("/search/suggest?q=call&n=3")
+    assert response.status_code == 200
+    suggestions = response.get_json()
+    assert 0 < len(suggestions) <= 3
+    assert all(suggestion["title"].lower().startswith("call") for suggestion in suggestions)
+
+
+def test_search_fuzzy(client):
+    response = client.get("/search/search?query=cal+of+duti&fuzzy=on")
+    assert response.status_code == 200
+    assert b"Call of Duty" in response.data
@@ -1,5 +1,7 @@
 import pytest
 import os
+import tracemalloc
+from datetime import date
 from games.domainmodel.model import (
     Publisher,
     Genre,
@@ -178,6 +180,16 @@ def test_game_release_date_setter():
         game.release_date = "21/08/2008"
 
 
+def test_game_release_date_ordinal():
+    game = Game(1, "Super Soccer Blast")
+    assert game.release_date_ordinal is None
+    game.release_date = "Oct 21, 2008"
+    assert game.release_date_ordinal == date(2008, 10, 21).toordinal()
+    with pytest.raises(ValueError):
+        game.release_date = "21/08/2008"
+    assert game.release_date_ordinal == date(2008, 10, 21).toordinal()
+
+
 def test_game_description_setter():
     game = Game(1, "Domino House")
     game.description = "This is a domino game"
@@ -255,6 +267,17 @@ def test_game_add_remove_genre():
     assert len(game1.genres) == 0
 
 
+def test_game_genres_sorted():
+    game1 = Game(1, "Super Soccer Blast")
+    game1.add_genre(Genre("Sports"))
+    game1.add_genre(Genre("Action"))
+    game1.add_genre(Genre("Indie"))
+    game1.add_genre(Genre("Action"))
+    assert game1.genres == (Genre("Action"), Genre("Indie"), Genre("Sports"))
+    game1.remove_genre(Genre("Indie"))
+    assert game1.genres == (Genre("Action"), Genre("Sports"))
+
+
 def test_user_initialization():
     user1 = User("Shyamli", "pw12345")
     user2 = User("asma", "pw67890")
@@ -323,6 +346,8 @@ def test_user_add_remove_favourite_games():
     user1.remove_favourite_game(game1)
     user1.remove_favourite_game(game2)
     assert repr(user1.favourite_games) == "[<Game 3, Fat City>]"
+    assert user1.is_favourite_game(game3)
+    assert not user1.is_favourite_game(game1)
 
 
 def test_user_add_remove_reviews():
@@ -348,6 +373,68 @@ def test_user_add_remove_reviews():
     assert user.reviews == [review3]
 
 
+def test_user_has_reviewed():
+    user = User("Shyamli", "pw12345")
+    game = Game(1, "Domino Game")
+    other_game = Game(2, "Deer Journey")
+    review1 = Review(user, game, 3, "Great game!")
+    review2 = Review(user, game, 4, "Superb game!")
+    assert not user.has_reviewed(game)
+    user.add_review(review1)
+    user.add_review(review2)
+    assert user.has_reviewed(game)
+    assert not user.has_reviewed(other_game)
+    user.remove_review(review1)
+    assert user.has_reviewed(game)
+    user.remove_review(review2)
+    assert not user.has_reviewed(game)
+    assert not user.has_reviewed("Domino Game")
+
+
+def test_review_hash():
+    user = User("Shyamli", "pw12345")
+    game = Game(1, "Domino Game")
+    review1 = Review(user, game, 4, "Great game!")
+    review2 = Review(User("Shyamli", "pw12345"), Game(1, "Domino Game"), 2, "Great game!")
+    assert hash(review1) == hash(review2)
+    assert review1 == review2
+    review1.comment = "Edited comment"
+    assert hash(review1) == hash(review2)
+    assert len({review1, review2}) == 2
+
+
+def test_game_rating_aggregates():
+    game = Game(1, "Domino Game")
+    review1 = Review(User("Shyamli", "pw12345"), game, 0, "Awful game!")
+    review2 = Review(User("asma", "pw67890"), game, 5, "Superb game!")
+    assert game.average_rating is None
+    assert game.rating_histogram == (0, 0, 0, 0, 0, 0)
+    game.add_review(review1)
+    assert game.average_rating == 0
+    game.add_review(review2)
+    game.add_review(review2)
+    assert game.average_rating == 2.5
+    assert game.rating_histogram == (1, 0, 0, 0, 0, 1)
+    game.remove_review(review1)
+    assert game.average_rating == 5
+    assert game.rating_histogram == (0, 0, 0, 0, 0, 1)
+
+
+def test_rating_aggregates_follow_rating_changes():
+    user = User("Shyamli", "pw12345")
+    game = Game(1, "Domino Game")
+    review = Review(user, game, 5, "Superb game!")
+    game.add_review(review)
+    user.add_review(review)
+
+    review.rating = 1
+    assert game.average_rating == 1
+    assert game.rating_histogram == (0, 1, 0, 0, 0, 0)
+    game.remove_review(review)
+    assert game.average_rating is None
+    assert game.rating_histogram == (0, 0, 0, 0, 0, 0)
+
+
 def test_review_initialization():
     user = User("Shyamli", "pw12345")
     game = Game(1, "Domino Game")
@@ -431,6 +518,28 @@ def test_wishlist_iter(wishlist, game):
     assert next(wishlist_iterator) == game
 
 
+def test_wishlist_independent_iterators(wishlist):
+    games = [Game(i, f"Game {i}") for i in range(3)]
+    for game in games:
+        wishlist.add_game(game)
+    outer = iter(wishlist)
+    assert next(outer) == games[0]
+    assert list(wishlist) == games
+    assert next(outer) == games[1]
+
+
+def test_wishlist_contains_and_select(wishlist):
+    games = [Game(i, f"Game {i}") for i in range(3)]
+    for game in games:
+        wishlist.add_game(game)
+    assert games[1] in wishlist
+    assert wishlist.select_game(2) == games[2]
+    wishlist.remove_game(games[1])
+    assert games[1] not in wishlist
+    assert wishlist.select_game(1) == games[2]
+    assert wishlist.list_of_games == [games[0], games[2]]
+
+
 # Unit tests for CSVReader
 def create_csv_reader():
     dir_name = os.path.dirname(
@@ -457,7 +566,7 @@ def test_read_csv_file():
     assert game.price == 0.99
     assert game.release_date == "Jul 19, 2016"
     assert game.publisher == Publisher("Curve Games")
-    assert game.genres == [Genre("Action"), Genre("Indie")]
+    assert game.genres == (Genre("Action"), Genre("Indie"))
 
 
 def test_tracks_dataset():
@@ -492,6 +601,35 @@ def test_genres_dataset():
     )
 
 
+def test_csv_reader_shares_genres_and_publishers():
+    reader = create_csv_reader()
+    games = reader.dataset_of_games
+    assert len({id(genre) for game in games for genre in game.genres}) == 24
+    assert len({id(game.publisher) for game in games}) == 798
+
+
+def test_shared_genres_and_publishers_footprint():
+    # the reader's games against the same games holding a Genre and Publisher
+    # copy per row, as the reader used to build them; if the reader stopped
+    # sharing instances the copies would cost nothing extra and this would fail
+    tracemalloc.start()
+    try:
+        reader = create_csv_reader()
+        games = reader.dataset_of_games
+        shared_size, _ = tracemalloc.get_traced_memory()
+        for game in games:
+            game.publisher = Publisher(game.publisher.publisher_name)
+            for genre in list(game.genres):
+                game.remove_genre(genre)
+                game.add_genre(Genre(genre.genre_name))
+        copied_size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    saved_per_game = (copied_size - shared_size) / len(games)
+    assert saved_per_game > 200
+
+
 def test_game_add_remove_reviews():
     user = User("testUser1", "pw12345")
     user2 = User("testUser2", "pw12345")
@@ -1,6 +1,11 @@
+from datetime import date
+
 import pytest
 
 from games.domainmodel.model import Game, User, Genre, Review
+from games.adapters.memory_repository import MemoryRepository
+from games.utilities.trigram_index import TrigramIndex
+from games.adapters.repository_populate import populate
 
 
 @pytest.fixture()
@@ -8,6 +13,14 @@ def sample_game():
     return Game(101010, "Test Game")
 
 
+@pytest.fixture()
+def full_repo():
+    # the whole catalogue rather than the test data, for the search tests
+    repo = MemoryRepository()
+    populate(repo, "games/adapters/data/")
+    return repo
+
+
 @pytest.fixture()
 def test_user():
     return User("testuser", "123ABCDEFGHi")
@@ -59,3 +72,237 @@ def test_get_user(in_memory_repo, test_user):
 
 def test_get_users(in_memory_repo):
     assert len(in_memory_repo.get_users()) == 5
+
+
+def test_get_game_by_id(in_memory_repo, sample_game):
+    in_memory_repo.add_game(sample_game)
+    assert in_memory_repo.get_game(101010) is sample_game
+    assert in_memory_repo.get_game("1228870").title == "Bartlow's Dread Machine"
+
+
+def test_get_game_invalid_id(in_memory_repo):
+    with pytest.raises(ValueError):
+        in_memory_repo.get_game(123456789)
+
+
+def test_add_duplicate_game(in_memory_repo):
+    in_memory_repo.add_game(Game(1228870, "Bartlow's Dread Machine"))
+    assert in_memory_repo.get_number_of_games() == 4
+
+
+def test_get_user_by_username(in_memory_repo, test_user):
+    in_memory_repo.add_user(test_user)
+    assert in_memory_repo.get_user("testuser") is test_user
+    assert in_memory_repo.get_user("not a user") is None
+
+
+def test_sorted_dataset_includes_added_game(in_memory_repo, sample_game):
+    sample_game.release_date = "Jan 1, 2000"
+    sample_game.price = 0.5
+    in_memory_repo.add_game(sample_game)
+    assert in_memory_repo.get_sorted_dataset("date")[0] == sample_game
+    assert in_memory_repo.get_sorted_dataset("latest")[-1] == sample_game
+    assert in_memory_repo.get_sorted_dataset("price")[0] == sample_game
+    assert [game.title for game in in_memory_repo.get_games()] == sorted(
+        game.title for game in in_memory_repo.get_games()
+    )
+
+
+def test_sorted_dataset_game_without_price_or_date(in_memory_repo, sample_game):
+    in_memory_repo.add_game(sample_game)
+    assert in_memory_repo.get_sorted_dataset("price")[-1] == sample_game
+    assert in_memory_repo.get_sorted_dataset("latest")[-1] == sample_game
+
+
+def test_get_page(in_memory_repo):
+    games, total = in_memory_repo.get_page("latest", 1, 2)
+    assert total == 4
+    assert [game.game_id for game in games] == [410320, 311120]
+
+    games, total = in_memory_repo.get_page("name", 3, 10, "Action")
+    assert total == 4
+    assert [game.game_id for game in games] == [311120]
+
+
+def test_get_page_unknown_genre(in_memory_repo):
+    assert in_memory_repo.get_page("name", 0, 10, "Not a genre") == ([], 0)
+
+
+def test_get_top_games(in_memory_repo):
+    assert [game.game_id for game in in_memory_repo.get_top_games("latest", 2)] == [1228870, 410320]
+    assert in_memory_repo.get_top_games("price", 10) == in_memory_repo.get_sorted_dataset("price")
+
+
+def test_search_games(in_memory_repo):
+    games, total = in_memory_repo.search_games("  CALL ")
+    assert total == 1 and games[0].game_id == 7940
+
+    # publisher matches rank below title matches
+    games, total = in_memory_repo.search_games("d3")
+    assert [game.game_id for game in games] == [410320]
+
+    games, total = in_memory_repo.search_games("", "Action", None, 1, 2)
+    assert total == 4 and [game.game_id for game in games] == [7940, 410320]
+
+
+def test_search_games_filters(in_memory_repo):
+    assert in_memory_repo.search_games("", None, "Buka Entertainment")[1] == 1
+    assert in_memory_repo.search_games("", "Not a genre") == ([], 0)
+
+
+def test_trigram_index_matches_substring_search():
+    index = TrigramIndex()
+    titles = {1: "Call of Duty", 2: "Duty Calls", 3: "Dread Machine", 4: "AAA"}
+    for key, title in titles.items():
+        index.add(key, title)
+    index.add(5, None)
+    # postings exist as soon as texts are added, before any search
+    assert index.estimate("duty") == 2
+
+    for query in ("call", "DUTY", "d", "ty c", "aaa", "aa", "", "calls of", "zzz"):
+        assert index.search(query) == {key for key, title in titles.items() if query.lower() in title.lower()}
+
+
+def test_search_games_finds_games_added_after_indexing(in_memory_repo, sample_game):
+    assert in_memory_repo.search_games("call")[1] == 1
+    in_memory_repo.add_game(sample_game)
+    games, _ = in_memory_repo.search_games(sample_game.title[2:8])
+    assert games == [sample_game]
+
+
+def test_search_games_combined_filters_match_a_full_scan(full_repo):
+    def scan(query, genre, publisher):
+        return {
+            game.game_id
+            for game in full_repo.get_games()
+            if (genre is None or Genre(genre) in game.genres)
+            and (publisher is None or game.publisher.publisher_name == publisher)
+            and any(
+                query.lower() in (text or "").lower()
+                for text in (game.title, game.publisher.publisher_name, game.description)
+            )
+        }
+
+    for query, genre, publisher in (
+        ("ninja", None, None),
+        ("the", "Action", None),
+        ("the", "Action", "Big Fish Games"),
+        ("a", None, "Big Fish Games"),
+        ("ninja", "Indie", None),
+        ("war", "Not a genre", None),
+        ("", "Casual", "Big Fish Games"),
+    ):
+        games, total = full_repo.search_games(query, genre, publisher)
+        assert total == len(games)
+        assert {game.game_id for game in games} == scan(query, genre, publisher)
+
+
+def test_search_games_multi_genre_filters(full_repo):
+    def genre_names(game):
+        return {genre.genre_name for genre in game.genres}
+
+    games, total = full_repo.search_games("", with_genres=["Action", "Indie"], without_genres=["Casual"])
+    assert total > 0
+    expected = [
+        game
+        for game in full_repo.get_games()
+        if {"Action", "Indie"} <= genre_names(game) and "Casual" not in genre_names(game)
+    ]
+    assert games == expected
+
+    games, total = full_repo.search_games("", any_genres=["Racing", "Sports"])
+    assert total > 0 and all(genre_names(game) & {"Racing", "Sports"} for game in games)
+
+    assert full_repo.search_games("", with_genres=["Not a genre"]) == ([], 0)
+    assert full_repo.search_games("", any_genres=["Not a genre"]) == ([], 0)
+    assert full_repo.search_games("", without_genres=["Not a genre"])[1] == full_repo.get_number_of_games()
+
+
+def test_search_games_price_and_release_date_ranges(full_repo):
+    after_2020 = date(2020, 1, 1)
+
+    games, total = full_repo.search_games("", min_price=0, max_price=0, released_from=after_2020)
+    assert total > 0
+    assert games == [
+        game
+        for game in full_repo.get_games()
+        if game.price == 0 and game.release_date_ordinal >= after_2020.toordinal()
+    ]
+
+    games, _ = full_repo.search_games("", min_price=5, max_price=9.99, released_to=after_2020)
+    assert games and all(5 <= game.price <= 9.99 for game in games)
+    assert all(game.release_date_ordinal <= after_2020.toordinal() for game in games)
+    assert full_repo.search_games("", min_price=10, max_price=5) == ([], 0)
+
+
+def test_search_games_sort_modes(full_repo):
+    for sort_mode in ("name", "date", "latest", "price"):
+        games, _ = full_repo.search_games("the", "Action", sort_mode=sort_mode)
+        assert games == [game for game in full_repo.get_sorted_dataset(sort_mode) if game in games]
+        games, _ = full_repo.search_games("", sort_mode=sort_mode)
+        assert games == full_repo.get_sorted_dataset(sort_mode)
+
+    user = User("rankuser", "Password123")
+    for rating, game in enumerate(full_repo.get_games_by_genre("Action")[:6]):
+        full_repo.add_review(Review(user, game, rating, "ranked"))
+    games, _ = full_repo.search_games("", "Action", sort_mode="rating")
+    assert [game.average_rating for game in games[:6]] == [5, 4, 3, 2, 1, 0]
+    ratings = [game.average_rating for game in games if game.average_rating is not None]
+    assert ratings and ratings == sorted(ratings, reverse=True)
+    assert all(game.average_rating is None for game in games[len(ratings):])
+
+
+def test_search_games_rating_order_follows_new_reviews(in_memory_repo):
+    games, _ = in_memory_repo.search_games("", sort_mode="rating")
+    unreviewed = next(game for game in games if game.average_rating is None)
+    user = User("rankuser", "Password123")
+    in_memory_repo.add_review(Review(user, unreviewed, 5, "top marks"))
+
+    assert in_memory_repo.search_games("", sort_mode="rating")[0][0] == unreviewed
+
+
+def test_trigram_index_similar_tolerates_typos():
+    index = TrigramIndex()
+    for key, title in enumerate(["the witcher 3 wild hunt", "wild west", "hunt down the freeman"]):
+        index.add(key, title)
+
+    assert index.similar("witcher 3 wld hunt")[0] == 0
+    assert index.similar("zzzz") == []
+    # no more than budget keys are scored
+    assert len(index.similar("hunt", budget=1, min_score=0)) == 1
+
+
+def test_sorted_dataset_compares_equal_to_lists(in_memory_repo):
+    by_price = in_memory_repo.get_sorted_dataset("price")
+    assert by_price == [game for game in by_price]
+    assert [game for game in by_price] == by_price
+    assert by_price != by_price[1:]
+    assert in_memory_repo.get_games() != "not games"
+
+
+def test_search_games_restricted_to_game_ids(in_memory_repo):
+    game_ids = [game.game_id for game in in_memory_repo.get_games()][:3]
+    games, total = in_memory_repo.search_games("", game_ids=game_ids + [123123123], sort_mode="price")
+    assert total == 3
+    assert games == [game for game in in_memory_repo.get_sorted_dataset("price") if game.game_id in game_ids]
+    assert in_memory_repo.search_game_ids("", game_ids=[]) == []
+
+
+def test_add_games_matches_adding_one_at_a_time(in_memory_repo):
+    games = list(in_memory_repo.get_games())
+    one_at_a_time = MemoryRepository()
+    for game in games:
+        one_at_a_time.add_game(game)
+    in_bulk = MemoryRepository()
+    in_bulk.add_games(games[: len(games) // 2])
+    in_bulk.add_games(games)
+
+    assert in_bulk.get_number_of_games() == len(games)
+    for sort_mode in ("name", "date", "latest", "price"):
+        assert list(in_bulk.get_sorted_dataset(sort_mode)) == list(
+            one_at_a_time.get_sorted_dataset(sort_mode)
+        )
+        for genre in one_at_a_time.get_genres():
+            assert in_bulk.get_page(sort_mode, 0, len(games), genre.genre_name) == (
+                one_at_a_time.get_page(sort_mode, 0, len(games), genre.genre_name)
+            )
@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 from games.adapters import memory_repository
 from games.adapters.memory_repository import MemoryRepository
@@ -5,6 +7,7 @@ from games.domainmodel.model import Game, Genre, Publisher, User, Review
 from games.genres import services as genre_services
 from games.search import services as search_services
 from games.home import services as home_services
+from games.user import services as user_services
 from games.authentication import services as authentication_services
 
 from werkzeug.security import generate_password_hash
@@ -31,7 +34,7 @@ def test_get_number_of_games(in_memory_repo):
 
 # Home services tests
 def test_get_latest_games(in_memory_repo):
-    result = home_services.get_sorted_games("latest", in_memory_repo)
+    result = home_services.get_top_games("latest", 4, in_memory_repo)
     assert result[0].game_id == 1228870 and result[1].game_id == 410320 and result[2].game_id == 311120 and result[3].game_id == 7940
 
 
@@ -41,13 +44,13 @@ def test_get_home_genres(in_memory_repo):
 
 
 # Games services tests
-def test_get_sorted_games_latest(in_memory_repo):
-    result = game_services.get_sorted_games("latest", in_memory_repo)
+def test_get_page_of_games_latest(in_memory_repo):
+    result = game_services.get_page_of_games("latest", 1, 4, in_memory_repo)
     assert result[0].game_id == 1228870 and result[1].game_id == 410320 and result[2].game_id == 311120 and result[3].game_id == 7940
 
 
-def test_get_sorted_games_alphabetical(in_memory_repo):
-    result = game_services.get_sorted_games("name", in_memory_repo)
+def test_get_page_of_games_alphabetical(in_memory_repo):
+    result = game_services.get_page_of_games("name", 1, 4, in_memory_repo)
     assert result[0].game_id == 1228870 and result[1].game_id == 7940 and result[2].game_id == 410320 and result[3].game_id == 311120
 
 
@@ -56,10 +59,9 @@ def test_get_sorted_games_alphabetical(in_memory_repo):
 #     assert result.game_id == 1228870
 
 
-def test_get_sublist(in_memory_repo):
-    super_list = [1, 2, 3, 4, 5]
-    result = game_services.get_sublist(super_list, 3, in_memory_repo)
-    assert len(result) == 2
+def test_get_page_of_games_last_page(in_memory_repo):
+    assert [game.game_id for game in game_services.get_page_of_games("name", 2, 3, in_memory_repo)] == [311120]
+    assert game_services.get_page_of_games("name", 3, 3, in_memory_repo) == []
 
 
 def test_get_number_of_pages(in_memory_repo):
@@ -68,15 +70,33 @@ def test_get_number_of_pages(in_memory_repo):
 
 
 # Genre services tests
-def test_get_sorted_games(in_memory_repo):
-    result = genre_services.get_sorted_games("name", "Action", in_memory_repo)
+def test_get_genre_page_of_games(in_memory_repo):
+    result, pages = genre_services.get_page_of_games("name", "Action", 1, 4, in_memory_repo)
     assert result[0].game_id == 1228870 and result[1].game_id == 7940 and result[2].game_id == 410320 and result[3].game_id == 311120
+    assert pages == 1
+
+
+def test_get_genre_page_of_games_pages(in_memory_repo):
+    result, pages = genre_services.get_page_of_games("name", "Action", 2, 3, in_memory_repo)
+    assert [game.game_id for game in result] == [311120]
+    assert pages == 2
+    assert genre_services.get_page_of_games("name", "Not a genre", 1, 3, in_memory_repo) == ([], 0)
+
+
+# User services tests
+def test_get_page_of_list_puts_the_add_button_first():
+    games = ["a", "b", "c", "d", "e"]
+    assert user_services.get_page_of_list(games, 1, 4) == [None, "a", "b", "c"]
+    assert user_services.get_page_of_list(games, 2, 4) == ["d", "e"]
+    assert user_services.get_page_of_list(games, 3, 4) == []
+    assert user_services.get_page_of_list([], 1, 4) == [None]
 
 
-def test_get_sublist(in_memory_repo):
-    super_list = [1, 2, 3, 4, 5]
-    result = genre_services.get_sublist(super_list, 3, in_memory_repo)
-    assert len(result) == 2
+def test_get_number_of_list_pages_counts_the_add_button():
+    assert user_services.get_number_of_list_pages(4, 0) == 1
+    assert user_services.get_number_of_list_pages(4, 3) == 1
+    assert user_services.get_number_of_list_pages(4, 4) == 2
+    assert user_services.get_number_of_list_pages(4, 7) == 2
 
 
 def test_get_genres(in_memory_repo):
@@ -166,6 +186,66 @@ def test_search_games_no_results(in_memory_repo):
     assert len(result) == 0
 
 
+def test_search_games_for_page_reuses_cached_matches(in_memory_repo):
+    search_services.search_cache.clear()
+    genre, publisher = Genre(""), Publisher("")
+    first_page, pages = search_services.search_games_for_page("a", genre, publisher, 1, 2, in_memory_repo)
+    second_page, _ = search_services.search_games_for_page(" A ", genre, publisher, 2, 2, in_memory_repo)
+
+    games, total = in_memory_repo.search_games("a")
+    assert pages == (total + 1) // 2
+    assert first_page + second_page == games[:4]
+    assert search_services.get_search_cache_stats()["hits"] == 1
+    assert search_services.get_search_cache_stats()["misses"] == 1
+
+
+def test_search_cache_is_invalidated_by_catalogue_changes(in_memory_repo):
+    search_services.search_cache.clear()
+    genre, publisher = Genre(""), Publisher("")
+    _, pages = search_services.search_games_for_page("", genre, publisher, 1, 1, in_memory_repo)
+    in_memory_repo.add_game(Game(101010, "Test Game"))
+    _, pages_after_add = search_services.search_games_for_page("", genre, publisher, 1, 1, in_memory_repo)
+
+    assert pages_after_add == pages + 1
+    assert search_services.get_search_cache_stats()["misses"] == 2
+
+
+def test_search_cache_evicts_least_recently_used():
+    cache = search_services.SearchResultCache(max_size=2)
+    repo = MemoryRepository()
+    cache.put(repo, "first", [1])
+    cache.put(repo, "second", [2])
+    assert cache.get(repo, "first") == [1]
+    cache.put(repo, "third", [3])
+
+    assert cache.get(repo, "second") is None
+    assert cache.get(repo, "first") == [1]
+    assert cache.stats == {"hits": 2, "misses": 1, "size": 2, "max_size": 2}
+
+
+def test_search_cache_is_safe_to_share_between_threads():
+    cache = search_services.SearchResultCache(max_size=4)
+    repo = MemoryRepository()
+    errors = []
+
+    def use_cache(worker):
+        try:
+            for i in range(2000):
+                key = (worker + i) % 8
+                if cache.get(repo, key) is None:
+                    cache.put(repo, key, [key])
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=use_cache, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.stats["size"] <= 4
+
+
 def test_get_results_for_page_upper_bound():
     matching_games = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21]
     result = search_services.get_results_for_page(matching_games, 2, 20)
@@ -211,6 +291,22 @@ def test_get_game_average_reviews_invalid_game_id(in_memory_repo):
         assert "is not in list" in str(e)
 
 
+def test_get_game_average_reviews_zero_ratings(in_memory_repo):
+    game = in_memory_repo.get_game(7940)
+    game.add_review(Review(User("testuser", "Testabcdefg123"), game, 0, "not for me"))
+    assert game_services.get_game_average_reviews(game) == 0
+
+
+def test_get_rating_distribution(in_memory_repo):
+    result = game_services.get_rating_distribution(in_memory_repo.get_game(1228870))
+    assert result == [(5, 1, 25), (4, 1, 25), (3, 1, 25), (2, 0, 0), (1, 1, 25), (0, 0, 0)]
+
+
+def test_get_rating_distribution_no_reviews(in_memory_repo):
+    result = game_services.get_rating_distribution(in_memory_repo.get_game(7940))
+    assert [count for _, count, _ in result] == [0, 0, 0, 0, 0, 0]
+
+
 def test_get_sorted_reviews_length_ascend(in_memory_repo):
     results = game_services.get_sorted_reviews(in_memory_repo.get_game(1228870), "comment_length-ascend", in_memory_repo)
     assert len(results[0].comment) <= len(results[1].comment) and len(results[1].comment) <= len(results[2].comment) and len(results[2].comment) <= len(results[3].comment)
@@ -279,3 +375,54 @@ def test_authenticate_user(in_memory_repo):
 
 def test_utilities_get_user(in_memory_repo):
     assert utilities.get_user("FirsttestUser1", in_memory_repo) == User("FirsttestUser1", "testUser1231")
+
+
+def test_suggest_titles_completes_prefixes_by_popularity(in_memory_repo):
+    titles = [game.title for game in in_memory_repo.get_games()]
+    prefix = titles[0][:3]
+    suggestions = search_services.suggest_titles(prefix.upper(), 5, in_memory_repo)
+    assert suggestions
+    assert all(suggestion["title"].lower().startswith(prefix.lower()) for suggestion in suggestions)
+
+    # a short prefix is answered from the precomputed top completions
+    first_letter = titles[0][0].lower()
+    expected = sorted(
+        (game for game in in_memory_repo.get_games() if game.title.lower().startswith(first_letter)),
+        key=lambda game: (-len(game.reviews), game.title),
+    )[:3]
+    assert [suggestion["game_id"] for suggestion in search_services.suggest_titles(first_letter, 3, in_memory_repo)] == [
+        game.game_id for game in expected
+    ]
+    assert search_services.suggest_titles("", 5, in_memory_repo) == []
+
+
+def test_suggest_titles_follows_new_reviews(in_memory_repo):
+    first_letter = in_memory_repo.get_games()[0].title[0]
+    suggestions = search_services.suggest_titles(first_letter, 10, in_memory_repo)
+    last = in_memory_repo.get_game(suggestions[-1]["game_id"])
+    for number in range(10):
+        in_memory_repo.add_review(Review(User(f"fan{number}", "Password123"), last, 5, "popular"))
+
+    assert search_services.suggest_titles(first_letter, 1, in_memory_repo)[0]["game_id"] == last.game_id
+
+
+def test_suggest_titles_follows_new_games(in_memory_repo):
+    assert search_services.suggest_titles("zzyzx", 5, in_memory_repo) == []
+    in_memory_repo.add_game(Game(101010, "Zzyzx Rally"))
+    assert search_services.suggest_titles("zzyzx", 5, in_memory_repo) == [{"game_id": 101010, "title": "Zzyzx Rally"}]
+
+
+def test_search_games_for_page_fuzzy(in_memory_repo):
+    search_services.search_cache.clear()
+    genre, publisher = Genre(""), Publisher("")
+    target = in_memory_repo.get_games()[0]
+    typo = target.title[:2] + target.title[3:]
+
+    games, _ = search_services.search_games_for_page(typo, genre, publisher, 1, 5, in_memory_repo, fuzzy=True)
+    assert games[0] == target
+
+    # the other filters still apply to fuzzy matches
+    games, _ = search_services.search_games_for_page(
+        typo, genre, publisher, 1, 5, in_memory_repo, fuzzy=True, min_price=target.price + 1
+    )
+    assert target not in games
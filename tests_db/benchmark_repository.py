@@ -0,0 +1,163 @@
+"""Latency and query plans for the SqlAlchemyRepository on a scaled dataset.
+
+Not collected by pytest. Run from the project directory with
+
+    python -m tests_db.benchmark_repository --scale 50
+
+--scale copies the CSV catalogue that many times under new game ids, and
+users, reviews, wishlists and favourites are generated on top of it. For
+every repository call the script prints the median and worst latency and
+the SQLite EXPLAIN QUERY PLAN of each statement the call issued, so a
+missing index shows up as a SCAN instead of a SEARCH.
+"""
+import argparse
+from datetime import date
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from games.adapters.database_repository import SqlAlchemyRepository
+from games.adapters.datareader.csvdatareader import GameFileCSVReader
+from games.adapters.orm import (
+    metadata,
+    map_model_to_tables,
+    users_table,
+    reviews_table,
+    wishlist_table,
+    wishlist_game_table,
+    user_favouritesgames_table,
+)
+from games.domainmodel.model import Game
+
+
+DATA_PATH = "games/adapters/data/"
+
+
+def scaled_games(scale):
+    reader = GameFileCSVReader(DATA_PATH + "games.csv")
+    reader.read_csv_file()
+    source = reader.dataset_of_games
+    id_step = max(game.game_id for game in source) + 1
+    games = []
+    for copy in range(scale):
+        for original in source:
+            game = Game(original.game_id + copy * id_step, f"{original.title} {copy}")
+            game.price = original.price
+            game.release_date = original.release_date
+            game.description = original.description
+            game.image_url = original.image_url
+            game.publisher = original.publisher
+            for genre in original.genres:
+                game.add_genre(genre)
+            games.append(game)
+    return games
+
+
+def populate(engine, repo, scale, number_of_users, games_per_user):
+    games = scaled_games(scale)
+    repo.add_games(games)
+
+    rng = random.Random(0)
+    game_ids = [game.game_id for game in games]
+    user_names = [f"user{i}" for i in range(number_of_users)]
+    review_rows, wishlist_game_rows, favourite_rows = [], [], []
+    for wishlist_id, user_name in enumerate(user_names, start=1):
+        for game_id in rng.sample(game_ids, games_per_user):
+            review_rows.append(
+                {"user_name": user_name, "game_id": game_id, "rating": rng.randint(0, 5), "comment": "benchmark"}
+            )
+            wishlist_game_rows.append({"wishlist_id": wishlist_id, "game_id": game_id})
+            favourite_rows.append({"user_id": user_name, "game_id": game_id})
+
+    with engine.begin() as connection:
+        connection.execute(users_table.insert(), [{"user_name": name, "password": "Benchmark123"} for name in user_names])
+        connection.execute(
+            wishlist_table.insert(),
+            [{"id": wishlist_id, "user_id": name} for wishlist_id, name in enumerate(user_names, start=1)],
+        )
+        connection.execute(reviews_table.insert(), review_rows)
+        connection.execute(wishlist_game_table.insert(), wishlist_game_rows)
+        connection.execute(user_favouritesgames_table.insert(), favourite_rows)
+    return games, user_names
+
+
+def repository_calls(games, user_names):
+    game_id = games[len(games) // 2].game_id
+    user_name = user_names[len(user_names) // 2]
+    genre_name = games[0].genres[0].genre_name
+    middle = len(games) // 2
+    return [
+        ("get_game", lambda repo: repo.get_game(game_id)),
+        ("get_game + reviews", lambda repo: repo.get_game(game_id).reviews),
+        ("get_user", lambda repo: repo.get_user(user_name)),
+        ("get_user + wishlist", lambda repo: repo.get_user(user_name).wishlist.list_of_games),
+        ("get_user + favourites", lambda repo: repo.get_user(user_name).favourite_games),
+        ("get_user + reviews", lambda repo: repo.get_user(user_name).reviews),
+        ("get_number_of_games", lambda repo: repo.get_number_of_games()),
+        ("get_genres", lambda repo: repo.get_genres()),
+        ("get_games_by_genre", lambda repo: repo.get_games_by_genre(genre_name)),
+        ("get_top_games latest", lambda repo: repo.get_top_games("latest", 5)),
+        ("get_top_games price", lambda repo: repo.get_top_games("price", 5)),
+        ("get_page name", lambda repo: repo.get_page("name", middle, 12)),
+        ("get_page date", lambda repo: repo.get_page("date", middle, 12)),
+        ("get_page genre", lambda repo: repo.get_page("name", 0, 12, genre_name)),
+        ("search_games", lambda repo: repo.search_games("ninja", offset=0, limit=20)),
+        ("search_games short query", lambda repo: repo.search_games("ni", offset=0, limit=20)),
+        ("search_games genre", lambda repo: repo.search_games("war", genre_name, None, 0, 20)),
+        (
+            "search_games free after 2020",
+            lambda repo: repo.search_games("", max_price=0, released_from=date(2020, 1, 1), limit=20),
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=20, help="copies of the CSV catalogue to load")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--games-per-user", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per repository call")
+    parser.add_argument("--database", default="sqlite://", help="database URI, in-memory SQLite by default")
+    args = parser.parse_args()
+
+    clear_mappers()
+    engine = create_engine(args.database)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    map_model_to_tables()
+    repo = SqlAlchemyRepository(sessionmaker(bind=engine))
+
+    start = time.perf_counter()
+    games, user_names = populate(engine, repo, args.scale, args.users, args.games_per_user)
+    print(f"loaded {len(games)} games and {len(user_names)} users in {time.perf_counter() - start:.2f}s\n")
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    for name, call in repository_calls(games, user_names):
+        timings = []
+        for _ in range(args.repeat):
+            repo.reset_session()
+            statements.clear()
+            start = time.perf_counter()
+            call(repo)
+            timings.append((time.perf_counter() - start) * 1000)
+        executed = list(statements)
+
+        print(f"{name}: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms, {len(executed)} statement(s)")
+        with engine.connect() as connection:
+            for statement, parameters in executed:
+                plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+                for row in plan:
+                    print(f"    {row[-1]}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
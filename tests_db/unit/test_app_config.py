@@ -0,0 +1,76 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from games import create_app
+from games.adapters.orm import schema_is_current
+import games.adapters.repository as repo
+
+
+def test_create_app_pools_and_tunes_sqlite_connections(tmp_path):
+    create_app(
+        {
+            "TESTING": "True",
+            "TEST_DATA_PATH": "tests/data/",
+            "REPOSITORY": "database",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'games.db'}",
+            "SQLALCHEMY_POOL_SIZE": 2,
+            "SQLITE_BUSY_TIMEOUT": 1234,
+        }
+    )
+    session = repo.repo_instance._session_cm.session
+    pool = session.get_bind().pool
+
+    assert isinstance(pool, QueuePool) and pool.size() == 2
+    assert session.execute("PRAGMA journal_mode").scalar() == "wal"
+    assert session.execute("PRAGMA synchronous").scalar() == 1
+    assert session.execute("PRAGMA busy_timeout").scalar() == 1234
+    repo.repo_instance.close_session()
+
+
+def test_create_app_removes_session_after_each_request(tmp_path):
+    app = create_app(
+        {
+            "TESTING": "True",
+            "TEST_DATA_PATH": "tests/data/",
+            "REPOSITORY": "database",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'games.db'}",
+        }
+    )
+    client = app.test_client()
+    sessions_removed = repo.repo_instance.session_metrics["sessions_removed"]
+
+    for _ in range(3):
+        assert client.get("/games").status_code == 200
+        assert repo.repo_instance._session_cm.identity_map_size == 0
+
+    metrics = repo.repo_instance.session_metrics
+    assert metrics["sessions_removed"] == sessions_removed + 3
+    assert metrics["last_identity_map_size"] <= metrics["max_identity_map_size"]
+
+
+def test_create_app_rebuilds_a_database_with_an_old_schema(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'games.db'}"
+    engine = create_engine(database_uri)
+    # the games table as it was before release_date_ordinal and full-text search
+    engine.execute(
+        "CREATE TABLE games (game_id INTEGER PRIMARY KEY, game_title TEXT NOT NULL, "
+        "game_price FLOAT NOT NULL, release_date VARCHAR(50) NOT NULL, "
+        "game_description VARCHAR(255), game_image_url VARCHAR(255), "
+        "game_website_url VARCHAR(255), publisher_name VARCHAR(255))"
+    )
+    assert not schema_is_current(engine)
+
+    app = create_app(
+        {
+            "TESTING": "False",
+            "TEST_DATA_PATH": "tests/data/",
+            "REPOSITORY": "database",
+            "SQLALCHEMY_DATABASE_URI": database_uri,
+        }
+    )
+
+    assert schema_is_current(engine)
+    assert app.test_client().get("/search/search?query=ninja").status_code == 200
+    assert repo.repo_instance.search_games("ninja")[1] > 0
+    repo.repo_instance.close_session()
+    engine.dispose()
@@ -2,6 +2,8 @@ from datetime import date, datetime
 
 import pytest
 
+from sqlalchemy import event, inspect
+
 from games.adapters.database_repository import SqlAlchemyRepository
 from games.domainmodel.model import (
     Publisher,
@@ -12,6 +14,7 @@ from games.domainmodel.model import (
     Wishlist,
 )
 from games.adapters.repository import RepositoryException
+from games.search import services as search_services
 
 
 def test_repository_can_add_a_user(session_factory):
@@ -150,3 +153,340 @@ def test_repository_get_sorted_reviews(session_factory):
         and len(results[1].comment) >= len(results[2].comment)
         and len(results[2].comment) >= len(results[3].comment)
     )
+
+
+def test_repository_loaded_user_has_reviewed(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = repo.get_user("thorke")
+    assert user.has_reviewed(repo.get_game(1995240))
+    assert not user.has_reviewed(repo.get_game(7940))
+
+
+def test_repository_wishlist_and_favourites_persist(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = repo.get_user("thorke")
+    for game_id in (7940, 1995240, 3010):
+        repo.add_to_wishlist(user, repo.get_game(game_id))
+        repo.add_to_favourites(user, repo.get_game(game_id))
+    repo.remove_from_wishlist(user, repo.get_game(1995240))
+    repo.remove_from_favourites(user, repo.get_game(7940))
+    repo.close_session()
+
+    user = SqlAlchemyRepository(session_factory).get_user("thorke")
+    assert [game.game_id for game in user.wishlist] == [7940, 3010]
+    assert [game.game_id for game in user.favourite_games] == [1995240, 3010]
+
+
+def test_repository_get_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for sort_mode in ("name", "price", "date", "latest"):
+        games, total = repo.get_page(sort_mode, 20, 10)
+        assert total == 877
+        assert games == repo.get_sorted_dataset(sort_mode, repo.get_games())[20:30]
+
+    games, total = repo.get_page("name", 340, 10, "Adventure")
+    assert total == 344
+    assert len(games) == 4
+
+
+def test_repository_get_top_games(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for sort_mode in ("name", "price", "date", "latest"):
+        assert repo.get_top_games(sort_mode, 5) == repo.get_sorted_dataset(sort_mode, repo.get_games())[:5]
+
+
+def test_repository_add_games(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    games = []
+    for game_id in (1, 2, 7940):
+        game = Game(game_id, f"Bulk game {game_id}")
+        game.price = 1.99
+        game.release_date = "Nov 12, 2007"
+        game.publisher = Publisher("Bulk Publisher")
+        game.add_genre(Genre("Bulk Genre"))
+        game.add_genre(Genre("Action"))
+        games.append(game)
+
+    repo.add_games(games)
+
+    assert repo.get_number_of_games() == 879
+    assert repo.get_game(7940).title != "Bulk game 7940"
+    assert len(repo.get_games_by_genre("Bulk Genre")) == 2
+    assert len(repo.get_genres()) == 25
+    assert repo.get_game(2).publisher == Publisher("Bulk Publisher")
+    # the full-text index was rebuilt after the load and its trigger restored
+    assert [game.game_id for game in repo.search_games("bulk game")[0]] == [1, 2]
+    game = Game(3, "Bulk game 3")
+    game.price = 1.99
+    game.release_date = "Nov 12, 2007"
+    game.publisher = Publisher("Bulk Publisher")
+    repo.add_game(game)
+    assert len(repo.search_games("bulk game")[0]) == 3
+
+
+def test_repository_search_games_matches_a_full_scan(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for query in ("ninja", "war", "big fish", "adventure", "ac"):
+        games, _ = repo.search_games(query, limit=1000)
+        assert {game.game_id for game in games} == {
+            game.game_id
+            for game in repo.get_games()
+            if any(
+                query in (text or "").lower()
+                for text in (game.title, game.publisher.publisher_name, game.description)
+            )
+        }
+
+
+def record_statements(session_factory, action):
+    # the (statement, parameters) pairs action runs
+    engine = session_factory.kw["bind"]
+    statements = []
+
+    def record_statement(*args):
+        statements.append((args[2], args[3]))
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    return statements
+
+
+def count_statements(session_factory, action):
+    return len(record_statements(session_factory, action))
+
+
+def record_game_loads(action):
+    # returns what action returned and the ids of the games it loaded from rows
+    loaded = []
+
+    def record_load(game, context):
+        loaded.append(game.game_id)
+
+    event.listen(Game, "load", record_load)
+    try:
+        result = action()
+    finally:
+        event.remove(Game, "load", record_load)
+    return result, loaded
+
+
+@pytest.mark.parametrize("sort_mode", ["name", "latest"])
+def test_repository_page_statement_count_independent_of_page_size(session_factory, sort_mode):
+    def render_page(limit):
+        repo = SqlAlchemyRepository(session_factory)
+        games, _ = repo.get_page(sort_mode, 0, limit)
+        for game in games:
+            game.publisher.publisher_name
+            [genre.genre_name for genre in game.genres]
+
+    assert count_statements(session_factory, lambda: render_page(5)) == count_statements(
+        session_factory, lambda: render_page(100)
+    )
+
+
+def test_repository_game_reviews_statement_count(session_factory):
+    def view_game():
+        repo = SqlAlchemyRepository(session_factory)
+        game = repo.get_game(1995240, with_reviews=True)
+        [(review.user.username, review.game.title) for review in game.reviews]
+
+    # the game with its publisher, its reviews with their users, and its genres
+    assert count_statements(session_factory, view_game) == 3
+
+
+def test_repository_get_game_leaves_reviews_unloaded(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    games = []
+    # the game with its publisher, and its genres
+    assert count_statements(session_factory, lambda: games.append(repo.get_game(1995240))) == 2
+    game = games[0]
+    assert "_Game__reviews" not in inspect(game).dict
+    assert len(game.reviews) == 5
+
+
+def test_repository_search_games(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    games, total = repo.search_games("ninja", offset=0, limit=3)
+    assert total == 10 and len(games) == 3
+    # a title match ranks above matches in descriptions only
+    assert "ninja" in games[0].title.lower()
+
+    games, total = repo.search_games("ninja", "Action", None)
+    assert total == len(games) and all(Genre("Action") in game.genres for game in games)
+
+    games, total = repo.search_games("ac", None, "Activision")
+    assert total == len(games) > 0
+    assert all(game.publisher == Publisher("Activision") for game in games)
+
+
+def test_repository_search_index_follows_updates(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    game = repo.get_game(7940)
+    game.title = "Zzyzx Rally"
+    repo._session_cm.commit()
+
+    assert [game.game_id for game in repo.search_games("zzyzx")[0]] == [7940]
+
+
+def test_repository_search_games_multi_genre_filters(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    games, total = repo.search_games("", with_genres=["Action", "Indie"], without_genres=["Casual"], limit=1000)
+    assert total == len(games) > 0
+    for game in games:
+        assert Genre("Action") in game.genres and Genre("Indie") in game.genres
+        assert Genre("Casual") not in game.genres
+
+    games, total = repo.search_games("", any_genres=["Racing", "Sports"], limit=1000)
+    assert total == len(games) > 0
+    assert all(Genre("Racing") in game.genres or Genre("Sports") in game.genres for game in games)
+
+
+def test_repository_search_games_price_and_release_date_ranges(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    after_2020 = date(2020, 1, 1)
+    games, total = repo.search_games("", min_price=0, max_price=0, released_from=after_2020, limit=1000)
+    assert total == len(games) > 0
+    assert all(game.price == 0 and game.release_date_ordinal >= after_2020.toordinal() for game in games)
+    assert total == len(
+        [
+            game
+            for game in repo.get_games()
+            if game.price == 0 and game.release_date_ordinal >= after_2020.toordinal()
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "filters, index",
+    [
+        ({"max_price": 0}, "ix_games_price_title"),
+        ({"min_price": 5, "max_price": 10, "sort_mode": "name"}, "ix_games_price_title"),
+        ({"released_from": date(2020, 1, 1)}, "ix_games_release_date_title"),
+    ],
+)
+def test_repository_range_searches_read_the_range_index(session_factory, filters, index):
+    repo = SqlAlchemyRepository(session_factory)
+    engine = session_factory.kw["bind"]
+    statements = record_statements(session_factory, lambda: repo.search_games("", limit=20, **filters))
+
+    # the count and the page of games, rather than a walk of the title index
+    for statement, parameters in statements[:2]:
+        plan = [row[-1] for row in engine.execute("EXPLAIN QUERY PLAN " + statement, parameters)]
+        assert any(index in step for step in plan)
+        assert not any("ix_games_game_title" in step for step in plan)
+
+
+def test_repository_search_games_sort_modes(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for sort_mode in ("name", "date", "latest", "price"):
+        games, _ = repo.search_games("war", sort_mode=sort_mode, limit=1000)
+        assert games == [game for game in repo.get_sorted_dataset(sort_mode) if game in games]
+
+    games, _ = repo.search_games("", sort_mode="rating", limit=1000)
+    ratings = [game.average_rating for game in games if game.average_rating is not None]
+    assert ratings and ratings == sorted(ratings, reverse=True)
+    assert all(game.average_rating is None for game in games[len(ratings):])
+
+
+def test_repository_get_games_by_ids_and_catalogue_version(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert [game.game_id for game in repo.get_games_by_ids([3010, 123123123, 7940])] == [3010, 7940]
+
+    games_version, reviews_version = repo.get_catalogue_version()
+    # written by another repository, as another worker would
+    SqlAlchemyRepository(session_factory).add_review(
+        Review(User("TestUser", "TestPassword1234"), repo.get_game(7940), 4, "versioned")
+    )
+    assert repo.get_catalogue_version()[0] == games_version
+    assert repo.get_catalogue_version()[1] != reviews_version
+
+
+def test_repository_catalogue_version_follows_game_edits(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    games_version, reviews_version = repo.get_catalogue_version()
+    game = repo.get_game(7940)
+    # an edit leaves the number of games and the last review id as they were
+    game.title = "Renamed Rally"
+    repo._session_cm.commit()
+
+    assert repo.get_catalogue_version()[0] != games_version
+    assert repo.get_catalogue_version()[1] == reviews_version
+
+
+def test_repository_search_game_ids(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for filters in ({}, {"genre": "Action"}, {"query": "war", "sort_mode": "price"}, {"query": "ni"}):
+        games, _ = repo.search_games(**filters)
+        assert repo.search_game_ids(**filters) == [game.game_id for game in games]
+
+
+def test_repository_get_review_counts(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    counts = repo.get_review_counts()
+    assert counts[1995240] == len(repo.get_game(1995240).reviews) == 5
+    assert 7940 not in counts
+
+
+def test_repository_user_can_review_a_game_twice(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = repo.get_user("thorke")
+    game = repo.get_game(1995240)
+    repo.add_review(Review(user, game, 4, "second thoughts"))
+    repo.close_session()
+
+    repo = SqlAlchemyRepository(session_factory)
+    assert len([review for review in repo.get_user("thorke").reviews if review.game.game_id == 1995240]) == 2
+
+
+def test_search_page_loads_only_the_games_on_the_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    search_services.search_cache.clear()
+    (games, pages), loaded = record_game_loads(
+        lambda: search_services.search_games_for_page("", Genre("Action"), Publisher(""), 1, 20, repo)
+    )
+    assert len(games) == 20 and pages > 1
+    assert len(loaded) == 20
+
+
+def test_suggest_after_a_review_reloads_no_games(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    search_services.suggest_titles("de", 3, repo)
+    repo.add_review(Review(User("TestUser", "TestPassword1234"), repo.get_game(7940), 4, "popular"))
+    suggestions, loaded = record_game_loads(lambda: search_services.suggest_titles("call", 3, repo))
+    assert suggestions[0]["game_id"] == 7940
+    assert loaded == []
+
+
+def test_fuzzy_search_filters_only_its_matches(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    search_services.fuzzy_title_matcher.match(repo, "warm up")
+    # a new review leaves the title index as it is
+    repo.add_review(Review(User("TestUser", "TestPassword1234"), repo.get_game(3010), 4, "fuzzy"))
+    search_services.search_cache.clear()
+    (games, _), loaded = record_game_loads(
+        lambda: search_services.search_games_for_page(
+            "cal of duti", Genre("Action"), Publisher(""), 1, 20, repo, fuzzy=True, sort_mode="price"
+        )
+    )
+    assert 7940 in [game.game_id for game in games]
+    assert len(loaded) == len(games)
+
+
+def test_repository_add_review_statement_count(session_factory):
+    # only the insert: loaded review collections hash the new review without
+    # loading its user, and unloaded ones are left unloaded
+    repo = SqlAlchemyRepository(session_factory)
+    user = repo.get_user("thorke")
+    game_with_reviews = repo.get_game(1995240)
+    assert len(game_with_reviews.reviews) == 5
+    assert count_statements(session_factory, lambda: repo.add_review(Review(user, game_with_reviews, 4, "again"))) == 1
+    assert len(game_with_reviews.reviews) == 6
+
+    repo = SqlAlchemyRepository(session_factory)
+    repo.close_session()
+    user = repo.get_user("thorke")
+    unloaded_game = repo.get_games_by_ids([7940])[0]
+    assert count_statements(session_factory, lambda: repo.add_review(Review(user, unloaded_game, 3, "fine"))) == 1
@@ -207,6 +207,15 @@ def test_saving_of_game(empty_session):
                      )]
 
 
+def test_saving_of_game_stores_release_date_ordinal(empty_session):
+    game = make_game()
+    empty_session.add(game)
+    empty_session.commit()
+
+    rows = list(empty_session.execute('SELECT release_date_ordinal FROM games'))
+    assert rows == [(datetime.date(2007, 11, 12).toordinal(),)]
+
+
 
 def test_saving_of_game_with_genre(empty_session):
     game = make_game()
@@ -5,7 +5,9 @@ from games.adapters.orm import metadata
 def test_database_populate_inspect_table_names(database_engine):
 
     inspector = inspect(database_engine)
-    assert inspector.get_table_names() == ['game_genres', 'game_wishlist', 'games', 'genres', 'publishers',
+    assert inspector.get_table_names() == ['catalogue_version', 'game_genres', 'game_wishlist', 'games', 'games_search',
+                                           'games_search_config', 'games_search_data', 'games_search_docsize',
+                                           'games_search_idx', 'genres', 'publishers',
                                            'reviews', 'user_favourites', 'users', 'wishlist']
 
 def test_database_populate_select_genres(database_engine):